@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import logging
+import re
+from dataclasses import asdict
+
+from enrichment import AI_MAX_TOKENS, AI_MODEL, PROMPT_VERSION, build_prompt, default_client, parse_insights
+from insights_cache import cache_key
+
+log = logging.getLogger(__name__)
+
+# La Message Batches API acepta hasta 100k requests por batch
+BATCH_MAX_REQUESTS = 10_000
+BATCH_POLL_INTERVAL = 60
+
+# Clave de metadata en el checkpoint: {batch_id: [listing_id, ...]}
+PENDING_BATCHES_META = "ai_batches"
+
+# Formato que exige la API para custom_id
+CUSTOM_ID_RE = re.compile(r"^[a-zA-Z0-9_-]{1,64}$")
+
+
+def batch_custom_id(listing_id: str) -> str:
+    # Un listing_id puede ser una URL entera: en ese caso va un hash. Es
+    # determinístico, así un batch retomado se vuelve a mapear sin guardar nada
+    if CUSTOM_ID_RE.match(listing_id):
+        return listing_id
+    return "h" + hashlib.sha256(listing_id.encode("utf-8")).hexdigest()[:40]
+
+
+class BatchEnricher:
+    # Modo batch: después del scraping junta los listings sin insights, los
+    # manda como Message Batches y registra los batch IDs en el checkpoint.
+    # Si la corrida se corta, la siguiente retoma el polling de esos IDs.
+
+    def __init__(self, checkpoint, client=None, model: str = AI_MODEL, cache=None,
+                 poll_interval: float = BATCH_POLL_INTERVAL, max_requests: int = BATCH_MAX_REQUESTS):
+        # client: cualquier objeto con messages.batches.{create,retrieve,results} async
+        self.checkpoint = checkpoint
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.submitted = 0
+        self.merged = 0
+        self.failed = 0
+
+    def _pending(self) -> dict:
+        return dict(self.checkpoint.get_meta(PENDING_BATCHES_META, {}))
+
+    def _set_pending(self, pending: dict):
+        self.checkpoint.set_meta(PENDING_BATCHES_META, pending)
+
+    def _apply(self, result, insights: dict):
+        result.highlight = insights.get("highlight")
+        result.opportunity = insights.get("opportunity")
+        self.checkpoint.put(result.listing_id, asdict(result))
+
+    async def submit(self, results: list) -> list[str]:
+        in_flight = {lid for ids in self._pending().values() for lid in ids}
+        todo = []
+        for r in results:
+            if not r.last_5_reviews or r.highlight or r.listing_id in in_flight:
+                continue
+            if self.cache is not None:
+                cached = self.cache.get(cache_key(r.last_5_reviews, self.model, PROMPT_VERSION))
+                if cached:
+                    self._apply(r, cached)
+                    continue
+            todo.append(r)
+
+        batch_ids = []
+        for i in range(0, len(todo), self.max_requests):
+            chunk = todo[i:i + self.max_requests]
+            batch = await self.client.messages.batches.create(requests=[
+                {
+                    "custom_id": batch_custom_id(r.listing_id),
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": AI_MAX_TOKENS,
+                        "messages": [{"role": "user", "content": build_prompt(r.last_5_reviews)}],
+                    },
+                }
+                for r in chunk
+            ])
+            # Registrar el ID antes de seguir: es lo que permite retomar
+            pending = self._pending()
+            pending[batch.id] = [r.listing_id for r in chunk]
+            self._set_pending(pending)
+            batch_ids.append(batch.id)
+            self.submitted += len(chunk)
+            log.info(f"Batch IA {batch.id} enviado con {len(chunk)} listings")
+        return batch_ids
+
+    async def _wait(self, batch_id: str):
+        while True:
+            batch = await self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return
+            log.info(f"Batch IA {batch_id}: {batch.processing_status}, esperando {self.poll_interval}s")
+            await asyncio.sleep(self.poll_interval)
+
+    async def collect(self, batch_id: str, by_custom_id: dict):
+        await self._wait(batch_id)
+        async for entry in await self.client.messages.batches.results(batch_id):
+            result = by_custom_id.get(entry.custom_id)
+            if result is None:
+                continue
+            if entry.result.type != "succeeded":
+                self.failed += 1
+                log.warning(f"Batch IA: {result.listing_id} terminó como {entry.result.type}")
+                continue
+            try:
+                insights = parse_insights(entry.result.message.content[0].text)
+            except Exception as e:
+                self.failed += 1
+                log.warning(f"AI insight failed for {result.listing_id}: {e}")
+                continue
+            self._apply(result, insights)
+            if self.cache is not None:
+                self.cache.put(cache_key(result.last_5_reviews, self.model, PROMPT_VERSION), insights)
+            self.merged += 1
+
+        pending = self._pending()
+        pending.pop(batch_id, None)
+        self._set_pending(pending)
+
+    async def run(self, results: list):
+        if self.client is None:
+            self.client = default_client()
+        by_custom_id = {batch_custom_id(r.listing_id): r for r in results}
+
+        resumed = list(self._pending())
+        if resumed:
+            log.info(f"Retomando {len(resumed)} batches de IA pendientes")
+        await self.submit(results)
+
+        await asyncio.gather(*[self.collect(batch_id, by_custom_id) for batch_id in self._pending()])
+        log.info(f"Batch IA: {self.submitted} enviados, {self.merged} integrados, {self.failed} fallidos")
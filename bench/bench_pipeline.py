@@ -0,0 +1,181 @@
+# Benchmark end-to-end de process_batch contra el servidor de fixtures local
+# (sin red) y un cliente de IA falso. Mide throughput, latencia por URL y RSS
+# pico (proceso + Chromium) para cada nivel de concurrencia y guarda los
+# resultados en bench/results/pipeline.jsonl para comparar entre corridas.
+#
+#   python -m bench.bench_pipeline --urls 60 --concurrency 2 5 10 [--http-first] [--page-kb 300]
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import main
+from bench.fixtures import FakeAIClient, FixtureConfig, FixtureServer
+from helpers import load_checkpoint
+from metrics import percentile, rss_mb
+
+RESULTS_FILE = Path(__file__).parent / "results" / "pipeline.jsonl"
+RSS_SAMPLE_S = 0.5
+
+
+def _tree_rss_mb(root_pid: int) -> float:
+    # RSS del proceso y todos sus descendientes (los procesos de Chromium); solo Linux
+    children: dict[int, list[int]] = {}
+    rss: dict[int, float] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii", errors="replace") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            pid, ppid, pages = int(entry), int(fields[1]), int(fields[21])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = pages * os.sysconf("SC_PAGE_SIZE") / 1_000_000
+    total, stack = 0.0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0.0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def tree_rss_mb() -> float:
+    if os.path.isdir("/proc"):
+        return _tree_rss_mb(os.getpid())
+    return rss_mb()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_level(urls: list[str], concurrency: int, args, workdir: Path) -> dict:
+    main.CONCURRENCY = concurrency
+    checkpoint = load_checkpoint(str(workdir / f"checkpoint-{concurrency}.json"))
+    latencies: list[float] = []
+    peak = 0.0
+
+    async def sample_rss():
+        nonlocal peak
+        while True:
+            peak = max(peak, tree_rss_mb())
+            await asyncio.sleep(RSS_SAMPLE_S)
+
+    sampler = asyncio.create_task(sample_rss())
+    ai_client = FakeAIClient(args.ai_latency) if args.ai else None
+    started = time.perf_counter()
+    try:
+        summary = await main.process_batch(
+            urls, checkpoint, ai_client=ai_client, ai_mode="online", ai_pack_size=args.ai_pack_size,
+            on_done=lambda r: latencies.append(sum((r.timings or {}).values())),
+            metrics_dir=str(workdir / f"metrics-{concurrency}"),
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+        checkpoint.close()
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "urls": len(urls),
+        "elapsed_s": round(elapsed, 2),
+        "pages_per_min": round(len(urls) / elapsed * 60, 1) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "peak_rss_mb": round(peak, 1),
+        "statuses": dict(summary.counts),
+        "ai_calls": ai_client.calls if ai_client else 0,
+    }
+
+
+async def run(args) -> list[dict]:
+    # Todo lo que el pipeline escribe a disco va a un directorio temporal
+    workdir = Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+    main.ADAPTIVE_CONCURRENCY = args.adaptive
+    main.REQUEST_RATE = 1000.0
+    main.HTTP_FIRST = args.http_first
+    # Siempre un Chromium propio: un servicio vivo en la máquina falsearía el arranque y el RSS
+    main.USE_BROWSER_SERVICE = False
+    main.SELECTOR_STATS_FILE = str(workdir / "selector_stats.json")
+    main.SELECTOR_REPORT_FILE = str(workdir / "selector_report.txt")
+
+    config = FixtureConfig(page_kb=args.page_kb, delay_ms=args.delay_ms,
+                           dialog_delay_ms=args.dialog_delay_ms, inline_reviews=args.inline_reviews,
+                           empty_rate=args.empty_rate)
+    rows = []
+    with FixtureServer(config) as server:
+        for level in args.concurrency:
+            # IDs distintos por nivel: nada queda salteado por checkpoint
+            urls = server.urls(args.urls, start=1000 + level * 100_000)
+            rows.append(await run_level(urls, level, args, workdir))
+    return rows
+
+
+def save(rows: list[dict], args):
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    record = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k != "concurrency"},
+        "results": rows,
+    }
+    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def print_table(rows: list[dict]):
+    print(f"{'conc':>5} | {'págs/min':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+          f"{'RSS pico':>9} | status")
+    print("-" * 78)
+    for r in rows:
+        statuses = ", ".join(f"{k}={v}" for k, v in sorted(r["statuses"].items()))
+        print(f"{r['concurrency']:>5} | {r['pages_per_min']:>9.1f} | {r['p50_ms']:>8.0f} | "
+              f"{r['p95_ms']:>8.0f} | {r['p99_ms']:>8.0f} | {r['peak_rss_mb']:>7.0f}MB | {statuses}")
+
+
+def previous_run():
+    if not RESULTS_FILE.exists():
+        return None
+    lines = RESULTS_FILE.read_text(encoding="utf-8").splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de process_batch contra fixtures locales")
+    parser.add_argument("--urls", type=int, default=40, help="listings por nivel de concurrencia")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--page-kb", type=int, default=300, help="peso de __NEXT_DATA__ por página")
+    parser.add_argument("--delay-ms", type=int, default=200, help="demora del server por página")
+    parser.add_argument("--dialog-delay-ms", type=int, default=300)
+    parser.add_argument("--inline-reviews", action="store_true",
+                        help="reseñas en __NEXT_DATA__ (con --http-first no se usa el browser)")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="fracción de páginas sin datos")
+    parser.add_argument("--http-first", action="store_true", help="probar el tier HTTP antes del browser")
+    parser.add_argument("--adaptive", action="store_true", help="dejar activa la concurrencia adaptativa")
+    parser.add_argument("--no-ai", dest="ai", action="store_false", help="sin etapa de IA")
+    parser.add_argument("--ai-pack-size", type=int, default=5, help="listings por request de IA")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="latencia del cliente de IA falso (s)")
+    args = parser.parse_args()
+
+    before = previous_run()
+    rows = asyncio.run(run(args))
+    print_table(rows)
+    save(rows, args)
+    if before:
+        print(f"\nCorrida anterior ({before['at']}, {before['revision']}):")
+        print_table(before["results"])
+    print(f"\nResultados agregados a {RESULTS_FILE}")
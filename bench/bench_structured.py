@@ -0,0 +1,121 @@
+# Micro-benchmarks: extractor de structured_data vs el enfoque anterior
+# (dos loops sobre JSON-LD + regex sobre __NEXT_DATA__ con unicode_escape).
+# El extractor no parsea el blob entero: una pasada de regex sobre las claves
+# objetivo y raw_decode solo de los valores (y de los objetos ancla como
+# aggregateRating), así decodifica bien el unicode sin pagar un json.loads.
+#
+#   python -m bench.bench_structured [--repeat 5]
+
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+
+from structured_data import extract_structured
+
+WORDS = ("lovely clean quiet cozy view host beach walk kitchen café niño "
+         "spacious bright terrace comfortable bed location 日本 friendly").split()
+
+
+def make_review(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 60))).capitalize() + "."
+
+
+def make_next_data(rng: random.Random, target_bytes: int) -> str:
+    # Blob con estructura parecida a la de Airbnb: muchas secciones de relleno
+    # y las reseñas en algún lugar profundo
+    sections = []
+    size = 0
+    while size < target_bytes:
+        section = {
+            "sectionId": f"S{len(sections)}",
+            "items": [{"id": rng.randint(1, 10**9), "text": make_review(rng), "flags": [1, 2, 3]}
+                      for _ in range(20)],
+        }
+        sections.append(section)
+        size += len(json.dumps(section))
+    reviews = [{"id": i, "comments": make_review(rng), "rating": 5} for i in range(24)]
+    doc = {"props": {"pageProps": {"sections": sections[: len(sections) // 2],
+                                   "reviews": {"reviews": reviews, "metadata": {"reviewsCount": 240}},
+                                   "more": sections[len(sections) // 2:]}}}
+    # ensure_ascii=False: como viene en el HTML real, con UTF-8 sin escapar
+    return json.dumps(doc, ensure_ascii=False)
+
+
+def make_jsonld() -> list[str]:
+    return [
+        json.dumps({"@type": "BreadcrumbList", "itemListElement": []}),
+        json.dumps({"@type": "VacationRental", "name": "Casa",
+                    "aggregateRating": {"ratingValue": "4.91", "reviewCount": "240"}}),
+    ]
+
+
+def legacy_extract(jsonld: list[str], raw_json: str):
+    rating = None
+    for raw in jsonld:
+        data = json.loads(raw)
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if "aggregateRating" in item:
+                rating = float(item["aggregateRating"].get("ratingValue", 0))
+                break
+        if rating:
+            break
+    review_count = None
+    for raw in jsonld:
+        data = json.loads(raw)
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if "aggregateRating" in item:
+                review_count = int(item["aggregateRating"].get("reviewCount", 0))
+                break
+        if review_count is not None:
+            break
+    reviews = []
+    for key in ("comments", "reviewBody"):
+        for c in re.findall(rf'"{key}"\s*:\s*"((?:[^"\\]|\\.){{30,500}})"', raw_json)[:5]:
+            try:
+                reviews.append(bytes(c, "utf-8").decode("unicode_escape"))
+            except Exception:
+                reviews.append(c)
+        if reviews:
+            break
+    return rating, review_count, reviews
+
+
+def timeit(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    jsonld = make_jsonld()
+    print(f"{'blob':>8} | {'regex (ms)':>10} | {'structured (ms)':>15} | speedup | reseñas ok")
+    print("-" * 62)
+    for size in (50_000, 500_000, 2_000_000, 8_000_000):
+        blob = make_next_data(rng, size)
+        legacy_ms = timeit(lambda: legacy_extract(jsonld, blob), args.repeat)
+        new_ms = timeit(lambda: extract_structured(jsonld, blob), args.repeat)
+        legacy_reviews = legacy_extract(jsonld, blob)[2]
+        new_reviews = extract_structured(jsonld, blob).reviews
+        # El decode con unicode_escape rompe los caracteres no ASCII
+        intact = sum(r in blob for r in new_reviews)
+        mangled = sum(r not in blob for r in legacy_reviews)
+        print(f"{len(blob) / 1e6:>6.1f}MB | {legacy_ms:>10.1f} | {new_ms:>15.1f} | "
+              f"{legacy_ms / new_ms:>6.1f}x | {intact}/{len(new_reviews)} "
+              f"(regex: {mangled} corruptas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Servidor local de listings sintéticos para los benchmarks: JSON-LD,
+# __NEXT_DATA__ con peso configurable, botón "Show all reviews" que abre un
+# modal con reseñas y latencia de respuesta configurable.
+#
+#   python -m bench.fixtures --port 8765   (para mirarlo a mano en un browser)
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Optional
+
+WORDS = ("lovely clean quiet cozy view host beach walk kitchen café "
+         "spacious bright terrace comfortable bed location friendly").split()
+
+
+@dataclass
+class FixtureConfig:
+    # Bytes de relleno en __NEXT_DATA__ (simula el peso de la página real)
+    page_kb: int = 300
+    # Demora del server antes de responder el HTML
+    delay_ms: int = 0
+    # Demora entre el click y la aparición de las reseñas en el modal
+    dialog_delay_ms: int = 300
+    # Reseñas embebidas en __NEXT_DATA__ (el tier HTTP alcanza y no se usa el browser)
+    inline_reviews: bool = False
+    # Fracción de listings sin JSON-LD ni reseñas (para generar no_data)
+    empty_rate: float = 0.0
+    seed: int = 1
+
+
+def _review(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40))).capitalize() + "."
+
+
+def render_listing(listing_id: int, config: FixtureConfig) -> str:
+    # Determinístico por listing_id: la misma URL siempre devuelve la misma página
+    rng = random.Random(listing_id * 7919 + config.seed)
+    if rng.random() < config.empty_rate:
+        return "<html><head><title>Listing</title></head><body><h1>Listing</h1></body></html>"
+
+    rating = round(rng.uniform(3.8, 5.0), 2)
+    count = rng.randint(5, 900)
+    reviews = [_review(rng) for _ in range(8)]
+    jsonld = {"@type": "LodgingBusiness", "name": f"Listing {listing_id}",
+              "aggregateRating": {"ratingValue": rating, "reviewCount": count}}
+
+    filler = []
+    size = 0
+    while size < config.page_kb * 1024:
+        item = {"id": rng.randint(1, 10**9), "text": _review(rng)}
+        filler.append(item)
+        size += len(item["text"]) + 30
+    page_props = {"listingTitle": f"Listing {listing_id}", "sections": filler}
+    if config.inline_reviews:
+        page_props["reviews"] = [{"comments": r} for r in reviews]
+    next_data = {"props": {"pageProps": page_props}}
+
+    spans = "".join(f"<li><span>{escape(r)}</span></li>" for r in reviews)
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Listing {listing_id}</title>
+<script type="application/ld+json">{json.dumps(jsonld)}</script>
+</head><body>
+<h1>Listing {listing_id}</h1>
+<span aria-label="{rating} out of 5">{rating}</span>
+<a href="#reviews"><span>{count} reviews</span></a>
+<button data-testid="pdp-show-all-reviews-button">Show all {count} reviews</button>
+<template id="reviews-tpl"><ul>{spans}</ul></template>
+<script>
+document.querySelector('[data-testid="pdp-show-all-reviews-button"]').addEventListener("click", () => {{
+    const dialog = document.createElement("div");
+    dialog.setAttribute("role", "dialog");
+    document.body.appendChild(dialog);
+    setTimeout(() => {{
+        dialog.appendChild(document.getElementById("reviews-tpl").content.cloneNode(true));
+    }}, {config.dialog_delay_ms});
+}});
+</script>
+<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data, ensure_ascii=False)}</script>
+</body></html>"""
+
+
+class FixtureServer:
+    # ThreadingHTTPServer en un thread aparte: /rooms/<id> devuelve un listing
+    def __init__(self, config: Optional[FixtureConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FixtureConfig()
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) != 2 or parts[0] != "rooms" or not parts[1].isdigit():
+                    self.send_error(404)
+                    return
+                if server.config.delay_ms:
+                    time.sleep(server.config.delay_ms / 1000)
+                body = render_listing(int(parts[1]), server.config).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self, n: int, start: int = 1000) -> list[str]:
+        return [f"{self.base_url}/rooms/{start + i}" for i in range(n)]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeAIClient:
+    # Mismo shape que AsyncAnthropic.messages.create, con latencia fija. Entiende
+    # los prompts empaquetados y responde el array por listing; drop_rate
+    # omite listings de la respuesta para ejercitar el fallback individual.
+    def __init__(self, latency_s: float = 0.5, drop_rate: float = 0.0, seed: int = 1):
+        self.messages = self
+        self.latency_s = latency_s
+        self.drop_rate = drop_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        prompt = kwargs["messages"][0]["content"]
+        insights = {"highlight": "Guests love the location.",
+                    "opportunity": "Improve the check-in instructions."}
+        ids = re.findall(r"^Listing (\S+):$", prompt, flags=re.MULTILINE)
+        if ids:
+            text = json.dumps([{"listing_id": lid, **insights} for lid in ids
+                               if self._rng.random() >= self.drop_rate])
+        else:
+            text = json.dumps(insights)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)],
+                               usage=SimpleNamespace(input_tokens=len(prompt) // 4,
+                                                     output_tokens=len(text) // 4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de listings sintéticos")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--page-kb", type=int, default=300)
+    parser.add_argument("--delay-ms", type=int, default=0)
+    args = parser.parse_args()
+    with FixtureServer(FixtureConfig(page_kb=args.page_kb, delay_ms=args.delay_ms), port=args.port) as srv:
+        print(f"Sirviendo en {srv.base_url}/rooms/<id> (Ctrl+C para salir)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,121 @@
+# Chromium de larga vida para corridas programadas: se levanta una vez y cada
+# corrida de main.py se conecta por CDP en vez de lanzar su propio browser.
+#
+#   python browser_service.py            (queda corriendo; Ctrl+C para cerrarlo)
+#   python main.py                       (usa el servicio si está vivo)
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+SERVICE_FILE = "output/browser_service.json"
+SERVICE_PORT = 9222
+SERVICE_START_TIMEOUT_S = 20
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-dev-shm-usage",
+]
+
+
+def _version(endpoint: str, timeout: float = 1.0) -> Optional[dict]:
+    # urllib.request pesa ~10 ms de import: solo se carga si hay que consultar el servicio
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def service_endpoint(path: str = SERVICE_FILE) -> Optional[str]:
+    # Endpoint CDP del servicio si está corriendo y responde; None si no
+    env = os.getenv("BROWSER_ENDPOINT")
+    if env:
+        return env
+    try:
+        with open(path, encoding="utf-8") as f:
+            endpoint = json.load(f)["endpoint"]
+    except (OSError, ValueError, KeyError):
+        return None
+    return endpoint if _version(endpoint) else None
+
+
+async def open_browser(p, endpoint: Optional[str] = None):
+    # Devuelve (browser, modo). Con un servicio vivo se conecta por CDP; si no,
+    # o si la conexión falla, lanza un Chromium propio como siempre
+    if endpoint:
+        try:
+            return await p.chromium.connect_over_cdp(endpoint), "servicio"
+        except Exception as e:
+            log.warning(f"No se pudo conectar al browser en {endpoint} ({e}), se lanza uno propio")
+    browser = await p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+    return browser, "launch"
+
+
+def chromium_executable() -> str:
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def serve(port: int = SERVICE_PORT, path: str = SERVICE_FILE):
+    endpoint = f"http://127.0.0.1:{port}"
+    if _version(endpoint):
+        print(f"Ya hay un browser escuchando en {endpoint}")
+        return
+
+    profile = tempfile.mkdtemp(prefix="etl-browser-")
+    proc = subprocess.Popen(
+        [chromium_executable(), "--headless=new", f"--remote-debugging-port={port}",
+         "--remote-debugging-address=127.0.0.1", f"--user-data-dir={profile}", *CHROMIUM_ARGS,
+         "about:blank"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + SERVICE_START_TIMEOUT_S
+        while not _version(endpoint):
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Chromium no levantó en {endpoint}")
+            time.sleep(0.2)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"endpoint": endpoint, "pid": proc.pid,
+                       "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}, f)
+        print(f"Browser listo en {endpoint} (pid {proc.pid}); las corridas de main.py lo usan solas")
+
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        proc.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        Path(path).unlink(missing_ok=True)
+        shutil.rmtree(profile, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chromium persistente para las corridas del ETL")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+    serve(args.port)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# Status que no se vuelven a scrapear si no se pasa una política de frescura
+SKIP_STATUSES = ("success", "blocked")
+
+# El journal se compacta cuando pesa tanto como el snapshot (con un piso): así
+# cada reescritura del snapshot se paga con al menos otro tanto de appends y el
+# costo total queda lineal en vez de crecer con el cuadrado de los listings
+COMPACT_RATIO = 1.0
+COMPACT_MIN_BYTES = 1_000_000
+
+# Clave reservada para metadata de la corrida (p.ej. batches de IA pendientes)
+META_KEY = "__meta__"
+
+
+class CheckpointStore:
+    # Snapshot compacto (checkpoint.json, mismo formato que antes) + journal
+    # JSONL append-only. Cada listing es una línea; el snapshot se reescribe
+    # solo al compactar, de forma atómica (tmp + os.replace). Dentro de un
+    # event loop la compactación corre en un thread: el journal se rota y los
+    # appends siguen en uno nuevo mientras se escribe el snapshot.
+
+    def __init__(self, path: str, compact_ratio: float = COMPACT_RATIO,
+                 compact_min_bytes: int = COMPACT_MIN_BYTES):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal.jsonl")
+        # Journal rotado por una compactación en curso; se borra al terminarla
+        self.rotated_path = self.path.with_suffix(".journal.old.jsonl")
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._index: dict[str, dict] = {}
+        self._meta: dict = {}
+        self._journal = None
+        self._pending = 0
+        self._journal_bytes = 0
+        self._snapshot_bytes = 0
+        self._compacting = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> "CheckpointStore":
+        self._index = {}
+        self._meta = {}
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._index.update(json.load(f))
+            except ValueError:
+                log.warning(f"Snapshot corrupto, se ignora: {self.path}")
+        self._meta = self._index.pop(META_KEY, {})
+
+        self._snapshot_bytes = self.path.stat().st_size if self.path.exists() else 0
+
+        replayed = 0
+        self._journal_bytes = 0
+        # El rotado (si una compactación se cortó) es más viejo que el actual
+        for journal in (self.rotated_path, self.journal_path):
+            if not journal.exists():
+                continue
+            self._journal_bytes += journal.stat().st_size
+            with open(journal, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea truncada por un corte a mitad de escritura
+                        continue
+                    if META_KEY in entry:
+                        self._meta.update(entry[META_KEY])
+                    else:
+                        self._index[entry["listing_id"]] = entry
+                    replayed += 1
+        self._pending = replayed
+        return self
+
+    def __contains__(self, listing_id: str) -> bool:
+        return listing_id in self._index
+
+    def __getitem__(self, listing_id: str) -> dict:
+        return self._index[listing_id]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, listing_id: str, default=None):
+        return self._index.get(listing_id, default)
+
+    def values(self):
+        return self._index.values()
+
+    def should_skip(self, listing_id: str, freshness=None) -> bool:
+        # freshness: FreshnessPolicy opcional (TTL por status sobre scraped_at)
+        entry = self._index.get(listing_id)
+        if freshness is not None:
+            return freshness.is_fresh(entry)
+        return entry is not None and entry.get("status") in SKIP_STATUSES
+
+    def get_meta(self, key: str, default=None):
+        return self._meta.get(key, default)
+
+    def set_meta(self, key: str, value):
+        self._meta[key] = value
+        self._append({META_KEY: {key: value}})
+
+    def put(self, listing_id: str, record: dict):
+        record = {**record, "listing_id": listing_id}
+        self._index[listing_id] = record
+        self._append(record)
+
+    def _append(self, entry: dict):
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            # Si la última línea quedó truncada, empezar en una línea nueva
+            if self._journal.tell():
+                with open(self.journal_path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._journal.write("\n")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        self._journal.write(line)
+        self._journal.flush()
+        self._pending += 1
+        self._journal_bytes += len(line)
+        if self._compacting is None and self._should_compact():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self.compact()
+            else:
+                self._compacting = asyncio.ensure_future(self._compact_in_background(*self._rotate()))
+
+    def _should_compact(self) -> bool:
+        return self._journal_bytes >= max(self.compact_min_bytes, self._snapshot_bytes * self.compact_ratio)
+
+    def _rotate(self) -> tuple[int, dict]:
+        # Corta el journal en este punto y devuelve el estado que cubre. Si
+        # todavía hay un rotado sin compactar se le agrega al final.
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.journal_path.exists():
+                if self.rotated_path.exists():
+                    with open(self.rotated_path, "ab") as dst, open(self.journal_path, "rb") as src:
+                        shutil.copyfileobj(src, dst)
+                    self.journal_path.unlink()
+                else:
+                    os.replace(self.journal_path, self.rotated_path)
+            self._generation += 1
+            self._pending = 0
+            self._journal_bytes = 0
+            # Copia superficial: put() reemplaza registros, no los modifica
+            return self._generation, {**self._index, META_KEY: dict(self._meta)}
+
+    def _write_snapshot(self, generation: int, data: dict):
+        with self._lock:
+            # Una rotación posterior ya tiene todo esto: que escriba esa
+            if generation != self._generation:
+                return
+            tmp = self.path.with_suffix(".json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            os.replace(tmp, self.path)
+            # Con el snapshot ya en disco el journal rotado se puede borrar; si
+            # se corta acá, re-aplicarlo sobre el snapshot es idempotente
+            if self.rotated_path.exists():
+                self.rotated_path.unlink()
+            self._snapshot_bytes = size
+
+    async def _compact_in_background(self, generation: int, data: dict):
+        try:
+            await asyncio.to_thread(self._write_snapshot, generation, data)
+        except Exception as e:
+            log.error(f"Falló la compactación de {self.path}: {e}")
+        finally:
+            self._compacting = None
+
+    def compact(self):
+        self._write_snapshot(*self._rotate())
+
+    def close(self):
+        if self._pending or self.rotated_path.exists():
+            self.compact()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
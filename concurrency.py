@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# Límites para las páginas en vuelo; el controlador se mueve dentro de este rango
+CONCURRENCY_MIN = 2
+CONCURRENCY_MAX = 10
+# Cada cuántos listings terminados se evalúa una decisión
+CONCURRENCY_WINDOW = 10
+# Umbrales que disparan la baja multiplicativa
+BAD_RATE_MAX = 0.15
+LATENCY_MAX_S = 20.0
+HEAP_MAX_MB = 250.0
+DECREASE_FACTOR = 0.5
+# no_data no se compara contra un umbral fijo (muchos listings no tienen datos
+# a cualquier concurrencia, ~39% en las corridas del readme) sino contra su
+# propia línea base: baja si los últimos NO_DATA_SPAN listings superan la base
+# por más de NO_DATA_RISE_MAX. La base es un promedio lento de las ventanas que
+# no provocaron una baja y solo se usa con al menos NO_DATA_SPAN listings.
+NO_DATA_SPAN = 50
+NO_DATA_RISE_MAX = 0.25
+NO_DATA_BASELINE_ALPHA = 0.1
+
+BAD_STATUSES = {"error", "blocked"}
+
+
+class ConcurrencyController:
+    # AIMD sobre la cantidad de páginas en vuelo: si la ventana sale limpia y
+    # el límite estuvo saturado sube de a uno; si suben los error/blocked, la
+    # latencia o la memoria del renderer, baja a la mitad. Con más páginas de
+    # las que la máquina aguanta, Airbnb devuelve páginas incompletas (no_data)
+    # antes que errores, así que también baja si no_data sube sobre su base.
+
+    def __init__(self, initial: int, min_limit: int = CONCURRENCY_MIN, max_limit: int = CONCURRENCY_MAX,
+                 window: int = CONCURRENCY_WINDOW, bad_rate_max: float = BAD_RATE_MAX,
+                 latency_max_s: float = LATENCY_MAX_S, heap_max_mb: float = HEAP_MAX_MB,
+                 no_data_rise_max: float = NO_DATA_RISE_MAX):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = min(max(initial, min_limit), self.max_limit)
+        self.window = window
+        self.bad_rate_max = bad_rate_max
+        self.latency_max_s = latency_max_s
+        self.heap_max_mb = heap_max_mb
+        self.no_data_rise_max = no_data_rise_max
+        self.no_data_baseline: Optional[float] = None
+        self._baseline_windows = 0
+        self._recent_no_data: deque = deque(maxlen=max(NO_DATA_SPAN, window))
+        self.in_flight = 0
+        self.decisions: list[dict] = []
+        self._peak = 0
+        self._samples: list[tuple[str, float, float]] = []
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self._peak = max(self._peak, self.in_flight)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def observe(self, status: str, latency_s: float, heap_mb: float = 0.0) -> Optional[dict]:
+        # Devuelve la decisión si esta observación cerró una ventana y cambió el límite
+        self._samples.append((status, latency_s, heap_mb))
+        self._recent_no_data.append(status == "no_data")
+        if len(self._samples) < self.window:
+            return None
+        samples, self._samples = self._samples, []
+        peak, self._peak = self._peak, self.in_flight
+
+        n = len(samples)
+        bad_rate = sum(s in BAD_STATUSES for s, _, _ in samples) / n
+        no_data_rate = sum(s == "no_data" for s, _, _ in samples) / n
+        recent_no_data = sum(self._recent_no_data) / len(self._recent_no_data)
+        latencies = sorted(lat for _, lat, _ in samples)
+        p50 = latencies[n // 2]
+        heap = max(h for _, _, h in samples)
+
+        reasons = []
+        if bad_rate > self.bad_rate_max:
+            reasons.append(f"error/blocked {bad_rate:.0%}")
+        baseline = self.no_data_baseline
+        warm = self._baseline_windows * n >= self._recent_no_data.maxlen
+        if (warm and len(self._recent_no_data) == self._recent_no_data.maxlen
+                and recent_no_data > baseline + self.no_data_rise_max):
+            if self.limit > self.min_limit:
+                reasons.append(f"no_data {recent_no_data:.0%} (base {baseline:.0%})")
+            else:
+                # Ya en el mínimo y sigue alto: no es la concurrencia, es el input
+                self.no_data_baseline = baseline = recent_no_data
+        if p50 > self.latency_max_s:
+            reasons.append(f"latencia p50 {p50:.1f}s")
+        if self.heap_max_mb and heap > self.heap_max_mb:
+            reasons.append(f"heap {heap:.0f}MB")
+
+        old = self.limit
+        if reasons:
+            self.limit = max(self.min_limit, math.floor(self.limit * DECREASE_FACTOR))
+            reason = "baja: " + ", ".join(reasons)
+            # Lo que se midió con demasiadas páginas no cuenta para la siguiente señal
+            self._recent_no_data.clear()
+        elif peak >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            reason = "sube: ventana limpia y límite saturado"
+        else:
+            reason = "se mantiene"
+        if not reasons and (baseline is None or recent_no_data <= baseline + self.no_data_rise_max / 2):
+            # Promedio simple mientras se junta la base, después exponencial. Con
+            # los últimos listings ya por encima de la base no se aprende: si no,
+            # la base persigue al throttling
+            self._baseline_windows += 1
+            alpha = max(1 / self._baseline_windows, NO_DATA_BASELINE_ALPHA)
+            self.no_data_baseline = no_data_rate if baseline is None else baseline + alpha * (no_data_rate - baseline)
+
+        decision = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "from": old, "to": self.limit, "reason": reason,
+            "bad_rate": round(bad_rate, 3), "no_data_rate": round(no_data_rate, 3),
+            "no_data_baseline": round(self.no_data_baseline or 0.0, 3), "p50_s": round(p50, 2), "heap_mb": round(heap, 1),
+        }
+        self.decisions.append(decision)
+        log.info(f"Concurrencia {old} -> {self.limit} ({reason}; error/blocked={bad_rate:.0%}, "
+                 f"no_data={no_data_rate:.0%}, "
+                 f"p50={p50:.1f}s, heap={heap:.0f}MB)")
+        if self.limit != old:
+            # Despierta a los que esperan si el límite subió
+            asyncio.ensure_future(self._notify())
+            return decision
+        return None
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    def summary(self) -> str:
+        limits = [self.decisions[0]["from"]] if self.decisions else [self.limit]
+        limits += [d["to"] for d in self.decisions]
+        changes = sum(d["from"] != d["to"] for d in self.decisions)
+        return (f"final {self.limit}, rango {min(limits)}-{max(limits)}, "
+                f"{changes} ajustes en {len(self.decisions)} ventanas")
@@ -0,0 +1,289 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+
+from insights_cache import cache_key
+
+log = logging.getLogger(__name__)
+
+AI_MODEL = "claude-haiku-4-5-20251001"
+AI_CONCURRENCY = 4
+AI_MAX_TOKENS = 300
+# Listings por request en modo empaquetado (1 = un request por listing) y
+# cuánto se espera a completar un paquete antes de mandarlo incompleto
+AI_PACK_SIZE = 5
+AI_PACK_WAIT_S = 2.0
+# Subir la versión del prompt que cambie (build_prompt / build_packed_prompt):
+# cada respuesta se cachea con la del prompt que la generó, así que solo se
+# invalida lo que produjo ese prompt
+PROMPT_VERSION = "1"
+PACKED_PROMPT_VERSION = "packed-1"
+
+
+def build_prompt(reviews: list[str]) -> str:
+    reviews_text = "\n\n".join(
+        f"Review {i+1}: {r}" for i, r in enumerate(reviews)
+    )
+
+    return f"""You are analyzing guest reviews for an Airbnb listing.
+
+Reviews:
+{reviews_text}
+
+Based solely on these reviews, provide:
+1. HIGHLIGHT: One specific characteristic that guests love most (be concrete, e.g. "Stunning ocean views from the rooftop terrace" not "great location").
+2. OPPORTUNITY: One specific improvement guests mention (or "None mentioned" if reviews are uniformly positive).
+
+Respond in this exact JSON format with no other text:
+{{"highlight": "...", "opportunity": "..."}}"""
+
+
+def build_packed_prompt(results: list) -> str:
+    # Las instrucciones van una sola vez para los K listings del paquete
+    blocks = []
+    for result in results:
+        reviews_text = "\n".join(f"Review {i+1}: {r}" for i, r in enumerate(result.last_5_reviews))
+        blocks.append(f"Listing {result.listing_id}:\n{reviews_text}")
+    listings_text = "\n\n".join(blocks)
+
+    return f"""You are analyzing guest reviews for several Airbnb listings. Treat each listing independently.
+
+{listings_text}
+
+For each listing, based solely on its own reviews, provide:
+1. HIGHLIGHT: One specific characteristic that guests love most (be concrete, e.g. "Stunning ocean views from the rooftop terrace" not "great location").
+2. OPPORTUNITY: One specific improvement guests mention (or "None mentioned" if reviews are uniformly positive).
+
+Respond with a JSON array containing exactly one object per listing, in this exact format with no other text:
+[{{"listing_id": "...", "highlight": "...", "opportunity": "..."}}]"""
+
+
+def parse_packed_insights(raw: str) -> dict[str, dict]:
+    # {listing_id: insights}; lo que no tenga la forma esperada se descarta
+    # y ese listing vuelve a pedirse solo
+    items = parse_insights(raw)
+    if not isinstance(items, list):
+        raise ValueError("la respuesta empaquetada no es un array")
+    out = {}
+    for item in items:
+        if isinstance(item, dict) and item.get("listing_id") is not None and item.get("highlight"):
+            out[str(item["listing_id"])] = {"highlight": item["highlight"],
+                                            "opportunity": item.get("opportunity")}
+    return out
+
+
+def parse_insights(raw: str) -> dict:
+    raw = raw.strip()
+    raw = re.sub(r"^```json\s*|```$", "", raw, flags=re.MULTILINE).strip()
+    return json.loads(raw)
+
+
+def default_client():
+    import anthropic
+    # Un solo cliente async para toda la corrida: reutiliza conexiones HTTP
+    return anthropic.AsyncAnthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+
+
+class PackStats:
+    # Requests, tokens y latencia, para comparar K=1 contra paquetes
+    def __init__(self):
+        self.requests = 0
+        self.listings = 0
+        self.fallbacks = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency_s = 0.0
+
+    def record(self, response, latency_s: float):
+        self.requests += 1
+        self.latency_s += latency_s
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+            self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+
+    def summary(self) -> str:
+        if not self.listings:
+            return "sin requests"
+        # Todo por listing enriquecido: los fallbacks suman su costo al total
+        n = self.listings
+        return (f"{self.requests} requests para {n} listings ({n / self.requests:.1f}/request), "
+                f"{self.input_tokens / n:.0f} tokens in + {self.output_tokens / n:.0f} out por listing, "
+                f"{self.latency_s / n:.2f}s por listing, {self.fallbacks} fallbacks a request individual")
+
+
+class AIEnricher:
+    # Etapa de enriquecimiento separada del scraping: los resultados entran a
+    # una cola y un grupo fijo de workers llama al modelo, así ningún slot del
+    # browser queda tomado mientras se espera la respuesta. Con pack_size > 1
+    # cada worker junta hasta K listings y los manda en un solo request.
+
+    def __init__(self, on_done, client=None, concurrency: int = AI_CONCURRENCY,
+                 model: str = AI_MODEL, queue_size: int = 0, cache=None,
+                 pack_size: int = AI_PACK_SIZE, pack_wait: float = AI_PACK_WAIT_S):
+        # on_done: callable (sync o async) que recibe cada resultado ya enriquecido
+        # client: cualquier objeto con un `messages.create` async (permite fakes)
+        # cache: InsightsCache opcional, se consulta antes de llamar al modelo
+        self.on_done = on_done
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+        self.model = model
+        self.pack_size = max(1, pack_size)
+        self.pack_wait = pack_wait
+        self.queue: asyncio.Queue = asyncio.Queue(
+            maxsize=queue_size or concurrency * max(4, self.pack_size))
+        self.enriched = 0
+        self.failed = 0
+        self.stats = PackStats()
+        self._workers: list[asyncio.Task] = []
+        # Un solo worker arma paquete a la vez, si no los items se reparten
+        # entre todos y ningún paquete se llena
+        self._pack_lock = asyncio.Lock()
+
+    def start(self):
+        if self.client is None:
+            self.client = default_client()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def submit(self, result):
+        await self.queue.put(result)
+
+    async def _from_cache(self, result) -> bool:
+        if self.cache is None:
+            return False
+        # SQLite compartido entre workers: esperar su lock no frena el event loop
+        # Sirve la respuesta de cualquiera de los dos prompts vigentes
+        keys = [cache_key(result.last_5_reviews, self.model, v) for v in (PROMPT_VERSION, PACKED_PROMPT_VERSION)]
+        cached = await asyncio.to_thread(self.cache.get_any, keys)
+        if not cached:
+            return False
+        result.highlight = cached["highlight"]
+        result.opportunity = cached["opportunity"]
+        log.info(f"AI insights desde cache para {result.listing_id}")
+        return True
+
+    async def _apply(self, result, insights: dict, prompt_version: str = PROMPT_VERSION):
+        result.highlight = insights.get("highlight")
+        result.opportunity = insights.get("opportunity")
+        self.enriched += 1
+        self.stats.listings += 1
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, cache_key(result.last_5_reviews, self.model, prompt_version),
+                                    insights)
+
+    async def generate(self, result):
+        if await self._from_cache(result):
+            return result
+        return await self._generate_uncached(result)
+
+    async def _generate_uncached(self, result):
+        # Request individual sin mirar el cache (el llamador ya lo consultó)
+        started = time.perf_counter()
+        try:
+            response = await self.client.messages.create(
+                model=self.model,
+                max_tokens=AI_MAX_TOKENS,
+                messages=[{"role": "user", "content": build_prompt(result.last_5_reviews)}],
+            )
+            self.stats.record(response, time.perf_counter() - started)
+            await self._apply(result, parse_insights(response.content[0].text))
+            log.info(f"AI insights generados para {result.listing_id}")
+        except Exception as e:
+            self.failed += 1
+            log.warning(f"AI insight failed for {result.listing_id}: {e}")
+        result.timings["ai"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def generate_packed(self, results: list) -> list:
+        pending = [r for r in results if not await self._from_cache(r)]
+        if len(pending) <= 1:
+            for result in pending:
+                await self._generate_uncached(result)
+            return results
+
+        started = time.perf_counter()
+        insights = {}
+        try:
+            response = await self.client.messages.create(
+                model=self.model,
+                max_tokens=AI_MAX_TOKENS * len(pending),
+                messages=[{"role": "user", "content": build_packed_prompt(pending)}],
+            )
+            self.stats.record(response, time.perf_counter() - started)
+            insights = parse_packed_insights(response.content[0].text)
+        except Exception as e:
+            log.warning(f"AI insights empaquetados fallaron para {len(pending)} listings: {e}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        for result in pending:
+            found = insights.get(str(result.listing_id))
+            if found:
+                await self._apply(result, found, PACKED_PROMPT_VERSION)
+                result.timings["ai"] = elapsed_ms
+                log.info(f"AI insights generados para {result.listing_id} (paquete de {len(pending)})")
+            else:
+                # Faltó en la respuesta o vino mal: request individual
+                self.stats.fallbacks += 1
+                await self._generate_uncached(result)
+                result.timings["ai"] = round(result.timings.get("ai", 0) + elapsed_ms, 1)
+        return results
+
+    async def _take_pack(self) -> list:
+        async with self._pack_lock:
+            return await self._fill_pack()
+
+    async def _fill_pack(self) -> list:
+        pack = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.pack_wait
+        while len(pack) < self.pack_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                pack.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return pack
+
+    async def _worker(self):
+        while True:
+            pack = await self._take_pack() if self.pack_size > 1 else [await self.queue.get()]
+            try:
+                if len(pack) > 1:
+                    await self.generate_packed(pack)
+                else:
+                    await self.generate(pack[0])
+            except Exception as e:
+                # El scraping ya está hecho: si falla la IA (o el cache) los
+                # listings siguen su camino sin insights
+                self.failed += sum(1 for r in pack if not r.highlight)
+                log.error(f"AI worker error en {', '.join(r.listing_id for r in pack)}: {e}")
+            finally:
+                for result in pack:
+                    try:
+                        done = self.on_done(result)
+                        if asyncio.iscoroutine(done):
+                            await done
+                    except Exception as e:
+                        log.error(f"AI worker error en {result.listing_id}: {e}")
+                    finally:
+                        self.queue.task_done()
+
+    async def close(self):
+        # Espera a que se vacíe la cola y apaga los workers
+        await self.queue.join()
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.stats.requests:
+            log.info(f"AI: {self.stats.summary()}")
+        close = getattr(self.client, "close", None)
+        if close:
+            done = close()
+            if asyncio.iscoroutine(done):
+                await done
@@ -0,0 +1,230 @@
+import re
+from html import unescape
+
+from structured_data import MAX_REVIEWS, extract_structured
+
+# Palabras que indican que la página es un bloqueo y no un listing
+BLOCK_MARKERS = ["captcha", "robot", "access denied", "unusual traffic"]
+
+RATING_SELECTORS = [
+    '[data-testid="pdp-reviews-highlight-banner-host-rating"] span',
+    'span[aria-label*="out of 5"]',
+    '._17p6nbba',
+    'span.r1lutz1s',
+]
+
+REVIEW_COUNT_SELECTORS = [
+    'a[href*="reviews"] span',
+    '[data-testid="pdp-reviews-highlight-banner-host-rating"] button',
+    'button[data-testid*="review"]',
+    '._s65ijh7',
+]
+
+REVIEW_TEXT_SELECTORS = [
+    # Selector confirmado funcionando via debug_modal.py
+    'div[role="dialog"] span',
+    'div[role="dialog"] div > span',
+    '[data-testid="review-card"] span[style*="-webkit-line-clamp"]',
+    '[data-testid="review-card"] span',
+    'div[role="dialog"] li span[style]',
+    'div[role="dialog"] li span',
+    'section[data-testid*="review"] span[style*="-webkit-line-clamp"]',
+    'li[class*="review"] span',
+    '._1gjypya',
+    '.r1bctolv span',
+    '[data-section-id="REVIEWS"] li span',
+    '[data-section-id="REVIEWS"] p',
+]
+
+# Palabras que indican que el texto es un rating, no una reseña
+EXCLUDE_PREFIXES = (
+    "rated ", "overall rating", "accuracy", "check-in",
+    "cleanliness", "communication", "location", "value",
+)
+
+BLOCK_CHECK_JS = """
+(markers) => {
+    const body = (document.body && document.body.innerText || "").toLowerCase();
+    return markers.some(k => body.includes(k));
+}
+"""
+
+# Lo que tiene que matchear el texto de un selector para contar como hit
+RATING_PATTERN = r"(\d+\.\d+)"
+REVIEW_COUNT_PATTERN = r"(\d[\d,]*)"
+
+# Un solo page.evaluate que junta todo lo que necesita el parser: JSON-LD,
+# h1, textos de los selectores de fallback y las reseñas candidatas ya
+# filtradas. Reemplaza los cientos de inner_text() por span. Cada cascada
+# corta en el primer hit y devuelve los probes (selector, hit, ms) para
+# las stats de selectores.
+EXTRACT_JS = """
+(cfg) => {
+    const text = (el) => (el ? (el.innerText || el.textContent || "") : "");
+    const probes = [];
+    const cascade = (field, selectors, pattern) => {
+        const re = new RegExp(pattern);
+        const texts = [];
+        for (const sel of selectors) {
+            const t0 = performance.now();
+            let value = null;
+            try {
+                const el = document.querySelector(sel);
+                value = el ? text(el) : null;
+            } catch (e) {}
+            const hit = value !== null && re.test(value);
+            probes.push({field: field, selector: sel, hit: hit, ms: performance.now() - t0});
+            texts.push(value);
+            if (hit) break;
+        }
+        return texts;
+    };
+
+    const jsonld = Array.from(
+        document.querySelectorAll('script[type="application/ld+json"]')
+    ).map(el => el.textContent || "");
+
+    const h1 = document.querySelector("h1");
+
+    let reviews = [];
+    for (const sel of cfg.reviewSelectors) {
+        if (reviews.length) break;
+        const t0 = performance.now();
+        let els;
+        try {
+            els = document.querySelectorAll(sel);
+        } catch (e) {
+            probes.push({field: "review_text", selector: sel, hit: false, ms: performance.now() - t0});
+            continue;
+        }
+        const seen = new Set();
+        for (const el of els) {
+            const clean = text(el).trim().split(/\\s+/).join(" ");
+            if (clean
+                    && clean.length > cfg.minLen && clean.length < cfg.maxLen
+                    && !seen.has(clean)
+                    && !cfg.excludePrefixes.some(p => clean.toLowerCase().startsWith(p))) {
+                seen.add(clean);
+                reviews.push(clean);
+            }
+            if (reviews.length >= cfg.maxReviews) break;
+        }
+        probes.push({field: "review_text", selector: sel, hit: reviews.length > 0, ms: performance.now() - t0});
+    }
+
+    // __NEXT_DATA__ puede pesar varios MB: solo se devuelve si hace falta
+    let nextData = null;
+    if (!reviews.length) {
+        const nd = document.querySelector("#__NEXT_DATA__");
+        if (nd) nextData = nd.textContent;
+    }
+
+    return {
+        jsonld: jsonld,
+        title: h1 ? text(h1).trim() : null,
+        ratingTexts: cascade("rating", cfg.ratingSelectors, cfg.ratingPattern),
+        reviewCountTexts: cascade("review_count", cfg.reviewCountSelectors, cfg.reviewCountPattern),
+        reviews: reviews,
+        nextData: nextData,
+        probes: probes,
+    };
+}
+"""
+
+
+def _extract_config(stats=None) -> dict:
+    # stats: SelectorStats opcional, reordena cada cascada según su historial
+    order = stats.order if stats is not None else (lambda field, selectors: selectors)
+    return {
+        "ratingSelectors": order("rating", RATING_SELECTORS),
+        "ratingPattern": RATING_PATTERN,
+        "reviewCountSelectors": order("review_count", REVIEW_COUNT_SELECTORS),
+        "reviewCountPattern": REVIEW_COUNT_PATTERN,
+        "reviewSelectors": order("review_text", REVIEW_TEXT_SELECTORS),
+        "excludePrefixes": list(EXCLUDE_PREFIXES),
+        "minLen": 40,
+        "maxLen": 2000,
+        "maxReviews": MAX_REVIEWS,
+    }
+
+
+async def is_blocked(page) -> bool:
+    return await page.evaluate(BLOCK_CHECK_JS, BLOCK_MARKERS)
+
+
+async def extract_page_data(page, stats=None) -> dict:
+    payload = await page.evaluate(EXTRACT_JS, _extract_config(stats))
+    if stats is not None:
+        stats.record_probes(payload.get("probes"))
+    return payload
+
+
+# ── Parseo del payload (Python puro, no toca el browser)
+
+def _first_match(texts: list, pattern: str):
+    for text in texts:
+        if not text:
+            continue
+        m = re.search(pattern, text)
+        if m:
+            return m.group(1)
+    return None
+
+
+def parse_payload(payload: dict) -> dict:
+    # JSON-LD y __NEXT_DATA__ se parsean una sola vez (structured_data); los
+    # textos de los selectores quedan como fallback
+    data = extract_structured(payload.get("jsonld") or [], payload.get("nextData"))
+
+    rating = data.rating
+    if not rating:
+        m = _first_match(payload.get("ratingTexts") or [], RATING_PATTERN)
+        rating = float(m) if m else None
+
+    review_count = data.review_count
+    if not review_count:
+        m = _first_match(payload.get("reviewCountTexts") or [], REVIEW_COUNT_PATTERN)
+        if m:
+            review_count = int(m.replace(",", ""))
+
+    reviews = list(payload.get("reviews") or []) or data.reviews
+
+    return {
+        "rating": rating,
+        "review_count": review_count,
+        "title": payload.get("title") or data.title,
+        "reviews": reviews[:MAX_REVIEWS],
+    }
+
+
+# ── Extracción desde HTML crudo (sin browser)
+
+_SCRIPT_RE = re.compile(r"<script\b([^>]*)>(.*?)</script>", re.DOTALL | re.IGNORECASE)
+_H1_RE = re.compile(r"<h1\b[^>]*>(.*?)</h1>", re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def payload_from_html(html: str) -> dict:
+    # Arma el mismo payload que EXTRACT_JS pero a partir del HTML del server,
+    # así parse_payload sirve para los dos caminos
+    jsonld = []
+    next_data = None
+    for attrs, body in _SCRIPT_RE.findall(html):
+        if "application/ld+json" in attrs:
+            jsonld.append(body)
+        elif "__NEXT_DATA__" in attrs:
+            next_data = body
+
+    title = None
+    m = _H1_RE.search(html)
+    if m:
+        title = " ".join(unescape(_TAG_RE.sub(" ", m.group(1))).split()) or None
+
+    return {
+        "jsonld": jsonld,
+        "title": title,
+        "ratingTexts": [],
+        "reviewCountTexts": [],
+        "reviews": [],
+        "nextData": next_data,
+    }
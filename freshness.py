@@ -0,0 +1,80 @@
+import calendar
+import hashlib
+import time
+from typing import Optional
+
+# Horas que un resultado se considera fresco según su status. Define también
+# la prioridad: los status con TTL corto vuelven a la cola antes. error no se
+# reusa nunca; blocked se reintenta pronto por si era transitorio.
+STATUS_TTL_H = {
+    "success": 24.0,
+    "no_data": 6.0,
+    "blocked": 2.0,
+    "error": 0.0,
+}
+DEFAULT_TTL_H = 0.0
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def now_iso() -> str:
+    return time.strftime(TIME_FORMAT, time.gmtime())
+
+
+def fingerprint(rating, review_count, reviews: list) -> Optional[str]:
+    # Huella barata del contenido: rating, cantidad y la reseña más nueva
+    if rating is None and review_count is None:
+        return None
+    newest = reviews[0] if reviews else ""
+    raw = f"{rating}|{review_count}|{newest}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _age_h(scraped_at: Optional[str], now: float) -> float:
+    if not scraped_at:
+        return float("inf")
+    try:
+        then = calendar.timegm(time.strptime(scraped_at, TIME_FORMAT))
+    except ValueError:
+        return float("inf")
+    return (now - then) / 3600
+
+
+class FreshnessPolicy:
+    def __init__(self, ttl_h: Optional[dict] = None, default_ttl_h: float = DEFAULT_TTL_H):
+        self.ttl_h = {**STATUS_TTL_H, **(ttl_h or {})}
+        self.default_ttl_h = default_ttl_h
+
+    def is_fresh(self, entry: Optional[dict], now: Optional[float] = None) -> bool:
+        if not entry:
+            return False
+        ttl = self.ttl_h.get(entry.get("status"), self.default_ttl_h)
+        if ttl <= 0:
+            return False
+        return _age_h(entry.get("scraped_at"), now or time.time()) < ttl
+
+    def previous(self, entry: Optional[dict]) -> Optional[dict]:
+        # Registro contra el que comparar al refrescar: solo sirve uno con datos
+        if entry and entry.get("status") == "success" and entry.get("last_5_reviews"):
+            return entry
+        return None
+
+
+def is_unchanged(previous: Optional[dict], fields: dict) -> bool:
+    # Con rating y cantidad iguales (y la reseña más nueva, si ya se tiene)
+    # el listing no cambió: no hace falta abrir el modal ni volver a la IA
+    if previous is None or fields.get("rating") is None:
+        return False
+    if fields.get("rating") != previous.get("rating") or fields.get("review_count") != previous.get("review_count"):
+        return False
+    reviews = fields.get("reviews") or []
+    return not reviews or reviews[0] == (previous.get("last_5_reviews") or [None])[0]
+
+
+def carry_over(previous: dict, fields: dict) -> dict:
+    return {**fields, "reviews": previous["last_5_reviews"], "title": fields.get("title") or previous.get("title")}
+
+
+def is_delta(record: dict, since: str) -> bool:
+    # Registros que cambiaron en esta corrida (los salteados conservan su scraped_at viejo)
+    return bool(record.get("changed")) and (record.get("scraped_at") or "") >= since
@@ -1,6 +1,10 @@
-import json
+import gzip
+import hashlib
 import re
-from pathlib import Path
+import sys
+from typing import Iterable, Iterator
+
+from checkpoint import CheckpointStore
 
 CHECKPOINT_FILE = "output/checkpoint.json"
 
@@ -8,16 +12,55 @@ def extract_listing_id(url: str) -> str:
     match = re.search(r"/rooms/(\d+)", url)
     return match.group(1) if match else url
 
-def load_checkpoint() -> dict:
-    if Path(CHECKPOINT_FILE).exists():
-        with open(CHECKPOINT_FILE) as f:
-            return json.load(f)
-    return {}
-
-def save_checkpoint(checkpoint: dict):
-    with open(CHECKPOINT_FILE, "w") as f:
-        json.dump(checkpoint, f)
+def load_checkpoint(path: str = CHECKPOINT_FILE) -> CheckpointStore:
+    return CheckpointStore(path).load()
 
 def load_urls(path: str) -> list[str]:
-    with open(path) as f:
-        return [line.strip() for line in f if line.strip()]
+    return list(iter_urls(path))
+
+def open_input(path: str):
+    # "-" lee de stdin; .gz se descomprime al vuelo
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+def iter_urls(path: str) -> Iterator[str]:
+    f = open_input(path)
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+class SeenSet:
+    # IDs numéricos se guardan como int (bastante más chico que un str);
+    # el resto como un hash de 8 bytes
+    def __init__(self):
+        self._seen: set[int] = set()
+
+    def _key(self, listing_id: str) -> int:
+        if listing_id.isdigit():
+            return int(listing_id)
+        digest = hashlib.blake2b(listing_id.encode("utf-8"), digest_size=8).digest()
+        # Bit alto encendido para no chocar con IDs numéricos chicos
+        return int.from_bytes(digest, "big") | (1 << 64)
+
+    def add(self, listing_id: str) -> bool:
+        key = self._key(listing_id)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+def unique_urls(urls: Iterable[str], seen: SeenSet) -> Iterator[str]:
+    for url in urls:
+        if seen.add(extract_listing_id(url)):
+            yield url
@@ -0,0 +1,99 @@
+import logging
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from extraction import parse_payload, payload_from_html
+from freshness import carry_over, is_unchanged
+
+log = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_S = 15
+# Campos que tiene que traer el HTML para no pasar al browser
+HTTP_REQUIRED_FIELDS = ("rating", "review_count", "reviews")
+
+
+@dataclass
+class TierStats:
+    http_hits: int = 0
+    http_fallbacks: int = 0
+    http_errors: int = 0
+    browser: int = 0
+
+    def summary(self) -> str:
+        attempted = self.http_hits + self.http_fallbacks + self.http_errors
+        rate = self.http_hits / attempted * 100 if attempted else 0
+        return (f"HTTP {self.http_hits}/{attempted} ({rate:.0f}%), "
+                f"{self.http_errors} errores HTTP, browser {self.browser}")
+
+
+def is_complete(fields: dict, required=HTTP_REQUIRED_FIELDS) -> bool:
+    for name in required:
+        value = fields.get(name)
+        if name == "reviews":
+            # Un listing sin reseñas no va a tener textos en ningún tier
+            if not value and fields.get("review_count") != 0:
+                return False
+        elif value is None:
+            return False
+    return True
+
+
+class HttpFetcher:
+    # Primer tier: GET del listing con un cliente HTTP async compartido y la
+    # misma extracción JSON-LD/__NEXT_DATA__ sobre el HTML crudo. Si faltan
+    # campos devuelve None y el listing sigue por el browser.
+
+    def __init__(self, user_agents: list[str], max_connections: int = 10,
+                 timeout: float = HTTP_TIMEOUT_S, required=HTTP_REQUIRED_FIELDS):
+        self.user_agents = user_agents
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.required = required
+        self.stats = TierStats()
+        self.client = None
+
+    def start(self) -> bool:
+        try:
+            import httpx
+        except ImportError:
+            log.warning("httpx no está instalado: se usa solo el browser")
+            return False
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            headers={
+                "Accept-Language": "en-US,en;q=0.9",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            },
+        )
+        return True
+
+    async def fetch_fields(self, url: str, previous: Optional[dict] = None) -> Optional[dict]:
+        # previous: registro de la corrida anterior; si rating y cantidad no
+        # cambiaron, sus reseñas completan lo que el HTML no trae
+        try:
+            response = await self.client.get(url, headers={"User-Agent": random.choice(self.user_agents)})
+        except Exception as e:
+            self.stats.http_errors += 1
+            log.debug(f"HTTP falló para {url}: {e}")
+            return None
+        if response.status_code != 200:
+            self.stats.http_errors += 1
+            log.debug(f"HTTP {response.status_code} para {url}")
+            return None
+
+        fields = parse_payload(payload_from_html(response.text))
+        if is_unchanged(previous, fields):
+            fields = carry_over(previous, fields)
+        if not is_complete(fields, self.required):
+            self.stats.http_fallbacks += 1
+            return None
+        self.stats.http_hits += 1
+        return fields
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+INSIGHTS_CACHE_FILE = "output/insights_cache.sqlite"
+CACHE_MAX_ENTRIES = 200_000
+CACHE_MAX_AGE_DAYS = 30
+
+
+def normalize_reviews(reviews: list[str]) -> list[str]:
+    return [" ".join(r.split()).lower() for r in reviews]
+
+
+def cache_key(reviews: list[str], model: str, prompt_version: str) -> str:
+    payload = json.dumps([model, prompt_version, normalize_reviews(reviews)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InsightsCache:
+    # Cache persistente de insights por contenido: mismas reseñas + mismo modelo
+    # + misma versión de prompt => misma respuesta, sin llamar al modelo.
+
+    def __init__(self, path: str = INSIGHTS_CACHE_FILE, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_age_days: float = CACHE_MAX_AGE_DAYS):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._writes = 0
+        # timeout alto: en modo multi-proceso varios workers comparten el archivo.
+        # WAL + commit por escritura: ningún worker retiene el lock de escritura.
+        # Desde código async se llama con asyncio.to_thread (esperar el lock no
+        # frena el event loop); el lock serializa la conexión entre threads.
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS insights ("
+            " key TEXT PRIMARY KEY, highlight TEXT, opportunity TEXT,"
+            " created_at REAL, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS insights_last_used ON insights(last_used)")
+        self.evict()
+
+    def get(self, key: str):
+        return self.get_any([key])
+
+    def get_any(self, keys: list[str]):
+        # La primera clave vigente; cuenta un solo hit o miss por consulta
+        with self._lock:
+            for key in keys:
+                found = self._get(key)
+                if found:
+                    self.hits += 1
+                    return found
+            self.misses += 1
+            return None
+
+    def _get(self, key: str):
+        row = self.db.execute(
+            "SELECT highlight, opportunity, created_at FROM insights WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or time.time() - row[2] > self.max_age_s:
+            return None
+        self.db.execute("UPDATE insights SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return {"highlight": row[0], "opportunity": row[1]}
+
+    def put(self, key: str, insights: dict):
+        with self._lock:
+            self._put(key, insights)
+
+    def _put(self, key: str, insights: dict):
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO insights VALUES (?, ?, ?, ?, ?)",
+            (key, insights.get("highlight"), insights.get("opportunity"), now, now),
+        )
+        self.db.commit()
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        cur = self.db.execute("DELETE FROM insights WHERE created_at < ?", (time.time() - self.max_age_s,))
+        evicted = cur.rowcount
+        (count,) = self.db.execute("SELECT COUNT(*) FROM insights").fetchone()
+        if count > self.max_entries:
+            cur = self.db.execute(
+                "DELETE FROM insights WHERE key IN ("
+                " SELECT key FROM insights ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            evicted += cur.rowcount
+        self.evicted += max(evicted, 0)
+        self.db.commit()
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0f}%)"
+
+    def close(self):
+        with self._lock:
+            self.db.commit()
+            self.db.close()
@@ -0,0 +1,112 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Un lease vencido (worker caído) vuelve a estar disponible para otro worker
+LEASE_TTL_S = 600
+LEASE_BATCH = 10
+
+
+class LeaseStore:
+    # Store SQLite compartido entre procesos (o máquinas con el mismo volumen)
+    # para repartir listings: cada worker toma un lease sobre un lote de IDs y
+    # los marca como terminados. Un listing nunca está leaseado por dos workers.
+
+    def __init__(self, path: str, ttl: float = LEASE_TTL_S):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        # isolation_level=None: las transacciones se manejan a mano con BEGIN IMMEDIATE
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            " listing_id TEXT PRIMARY KEY, url TEXT NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS listings_state ON listings(state, lease_expires)")
+
+    def seed(self, rows: Iterable[tuple[str, str, bool]], chunk: int = 1000) -> int:
+        # rows: (listing_id, url, fresco). Los IDs existentes no se tocan, así
+        # varias máquinas pueden sembrar el mismo store sin pisarse; la única
+        # excepción es un 'done' que ya no está fresco, que vuelve a 'pending'.
+        # Devuelve cuántas filas se insertaron o se reabrieron.
+        inserted = 0
+        buf = []
+        for listing_id, url, done in rows:
+            buf.append((listing_id, url, "done" if done else "pending"))
+            if len(buf) >= chunk:
+                inserted += self._insert(buf)
+                buf = []
+        if buf:
+            inserted += self._insert(buf)
+        return inserted
+
+    def _insert(self, buf: list) -> int:
+        self.db.execute("BEGIN IMMEDIATE")
+        cur = self.db.executemany(
+            "INSERT INTO listings (listing_id, url, state) VALUES (?, ?, ?)"
+            " ON CONFLICT(listing_id) DO UPDATE SET state = 'pending', owner = NULL, lease_expires = NULL"
+            " WHERE listings.state = 'done' AND excluded.state = 'pending'",
+            buf,
+        )
+        self.db.execute("COMMIT")
+        return cur.rowcount
+
+    def lease(self, owner: str, n: int = LEASE_BATCH) -> list[tuple[str, str]]:
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.db.execute(
+                "SELECT listing_id, url FROM listings"
+                " WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)"
+                " ORDER BY rowid LIMIT ?",
+                (now, n),
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE listings SET state = 'leased', owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1 WHERE listing_id = ?",
+                [(owner, now + self.ttl, listing_id) for listing_id, _ in rows],
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return rows
+
+    def renew(self, listing_id: str, owner: str) -> bool:
+        # Se llama cuando el worker empieza a procesar el listing: el tiempo en
+        # la cola del scheduler no consume el lease. False si ya venció y lo
+        # tomó otro worker.
+        cur = self.db.execute(
+            "UPDATE listings SET lease_expires = ?"
+            " WHERE listing_id = ? AND owner = ? AND state = 'leased'",
+            (time.time() + self.ttl, listing_id, owner),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, listing_id: str, owner: str):
+        self.db.execute(
+            "UPDATE listings SET state = 'done', lease_expires = NULL"
+            " WHERE listing_id = ? AND owner = ?",
+            (listing_id, owner),
+        )
+
+    def leased_urls(self, owner: str, n: int = LEASE_BATCH) -> Iterator[str]:
+        while True:
+            rows = self.lease(owner, n)
+            if not rows:
+                return
+            for _, url in rows:
+                yield url
+
+    def listing_ids(self) -> Iterator[str]:
+        for (listing_id,) in self.db.execute("SELECT listing_id FROM listings ORDER BY rowid"):
+            yield listing_id
+
+    def counts(self) -> dict:
+        return dict(self.db.execute("SELECT state, COUNT(*) FROM listings GROUP BY state").fetchall())
+
+    def close(self):
+        self.db.close()
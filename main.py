@@ -1,47 +1,91 @@
+import argparse
 import asyncio
-import csv
 import json
 import logging
+import multiprocessing
 import os
+import socket
 import random
-import re
 import sys
 import time
+from collections import Counter
 from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Optional
-from helpers import extract_listing_id, load_checkpoint, save_checkpoint, load_urls 
-import anthropic
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from typing import Callable, Iterable, Optional
+from browser_service import open_browser, service_endpoint
+from checkpoint import CheckpointStore
+from concurrency import CONCURRENCY_MAX, CONCURRENCY_MIN, ConcurrencyController
+from http_fetch import HttpFetcher, TierStats
+from helpers import SeenSet, extract_listing_id, iter_urls, load_checkpoint, unique_urls
+from ai_batch import BatchEnricher
+from enrichment import AI_PACK_SIZE, AIEnricher
+from insights_cache import INSIGHTS_CACHE_FILE, InsightsCache
+from lease_store import LeaseStore
+from metrics import METRICS_DIR, METRICS_JSON, METRICS_PROM, RunMetrics
+from extraction import BLOCK_MARKERS, extract_page_data, is_blocked, parse_payload
+from freshness import FreshnessPolicy, carry_over, fingerprint, is_delta, is_unchanged, now_iso
+from network_capture import ResponseCapture
+from pool import PagePool
+from routing import RoutePolicy
+from scheduler import RateLimiter, Scheduler
+from selector_stats import SELECTOR_REPORT_FILE, SELECTOR_STATS_FILE, SelectorStats
+from snapshots import SNAPSHOT_DIR, SnapshotArchive, reextract
+from sinks import CsvSink, FilteredSink, JsonArraySink, JsonlSink, MultiSink, parquet_sink
+from readiness import (
+    CLOSE_TIMEOUT_MS, REVIEW_BUTTON_TIMEOUT_MS, StageTimer,
+    wait_for_hidden, wait_for_listing, wait_for_review_dialog, wait_for_selector,
+)
 
 INPUT_FILE = "listings.txt"
 OUTPUT_CSV = "output/listings_output.csv"
 OUTPUT_JSON = "output/listings_output.json"
+OUTPUT_JSONL = "output/listings_output.jsonl"
+# Solo los listings nuevos o que cambiaron en esta corrida
+OUTPUT_DELTA = "output/listings_delta.jsonl"
+# Opcional (requiere pyarrow), p.ej. "output/listings_output.parquet"
+OUTPUT_PARQUET = None
+# Modo multi-proceso: checkpoints/salidas por worker antes del merge
+WORKERS_DIR = "output/workers"
+WORKER_CACHE_STATS = "insights_cache_stats.json"
 CHECKPOINT_FILE = "output/checkpoint.json"
 
 CONCURRENCY = 5
-REQUEST_DELAY = (2, 3)
+# Ajustar las páginas en vuelo en runtime (AIMD) entre CONCURRENCY_MIN y CONCURRENCY_MAX
+ADAPTIVE_CONCURRENCY = True
+# Requests por segundo para toda la corrida (presupuesto global, no por slot)
+REQUEST_RATE = 1.0
 PAGE_TIMEOUT = 30_000
 MAX_RETRIES = 2
+BLOCK_RESOURCES = True
+# Probar primero un GET HTTP plano y usar el browser solo si faltan campos
+HTTP_FIRST = True
 
 AI_ENABLED = bool(os.getenv("ANTHROPIC_API_KEY"))
-AI_MODEL = "claude-haiku-4-5-20251001"
-
-Path("output").mkdir(exist_ok=True)
-try:
-    sys.stdout.reconfigure(encoding="utf-8")
-except AttributeError:
-    pass
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("output/etl.log", encoding="utf-8"),
-    ],
-)
+# "online": un request por listing mientras se scrapea; "batch": Message Batches al final
+AI_MODE = "online"
+
+# Conectarse al browser de browser_service.py si está corriendo en vez de lanzar uno
+USE_BROWSER_SERVICE = True
+
 log = logging.getLogger(__name__)
 
+
+def setup_logging():
+    # Se llama al arrancar (main y cada worker), no al importar el módulo
+    Path("output").mkdir(exist_ok=True)
+    try:
+        sys.stdout.reconfigure(encoding="utf-8")
+    except AttributeError:
+        pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler("output/etl.log", encoding="utf-8"),
+        ],
+    )
+
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
@@ -64,12 +108,137 @@ class ListingResult:
     opportunity: Optional[str] = None
     error_message: Optional[str] = None
     scraped_at: Optional[str] = None
+    # Huella de rating + cantidad + reseña más nueva; changed compara con la corrida anterior
+    fingerprint: Optional[str] = None
+    changed: Optional[bool] = None
+    # Refresco fallido sobre un registro bueno: se conserva el registro y se anota el intento
+    last_attempt_status: Optional[str] = None
+    last_attempt_at: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass
+class RunSummary:
+    counts: Counter = field(default_factory=Counter)
+    with_reviews: int = 0
+    with_ai: int = 0
+    unchanged: int = 0
+    # Solo se guardan los IDs cuando hay que volver a leerlos (modo batch)
+    keep_ids: bool = False
+    listing_ids: list = field(default_factory=list)
+    tiers: Optional[TierStats] = None
+    metrics: Optional[RunMetrics] = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, result: ListingResult):
+        self.counts[result.status] += 1
+        self.with_reviews += bool(result.last_5_reviews)
+        self.with_ai += bool(result.highlight)
+        self.unchanged += result.changed is False
+        if self.keep_ids:
+            self.listing_ids.append(result.listing_id)
 
 # ── Scraping 
 
-async def scrape_listing(page, url: str) -> ListingResult:
+REVIEW_BUTTON_SELECTORS = [
+    'button[data-testid="pdp-show-all-reviews-button"]',
+    'a[data-testid="pdp-show-all-reviews-button"]',
+    'button:has-text("Show all")',
+    'button:has-text("reviews")',
+]
+
+CLOSE_BUTTON_SELECTORS = [
+    'button[aria-label="Close"]',
+    'button[aria-label="Cerrar"]',
+    'div[role="dialog"] button:has-text("Got it")',
+    'div[role="dialog"] button:has-text("OK")',
+    'div[role="dialog"] button:has-text("Close")',
+]
+
+
+async def _probe(page, stats: Optional[SelectorStats], field: str, selectors: list[str]):
+    # Prueba la cascada en orden y devuelve el primer elemento que aparece
+    for selector in selectors:
+        started = time.perf_counter()
+        try:
+            handle = await page.query_selector(selector)
+        except Exception:
+            handle = None
+        if stats is not None:
+            stats.record(field, selector, handle is not None, (time.perf_counter() - started) * 1000)
+        if handle:
+            return handle
+    return None
+
+
+async def open_reviews_dialog(page, timer: StageTimer, stats: Optional[SelectorStats] = None) -> bool:
+    # Con stats, las cascadas van en el orden aprendido (los que más ganan primero)
+    button_selectors = stats.order("review_button", REVIEW_BUTTON_SELECTORS) if stats else REVIEW_BUTTON_SELECTORS
+    close_selectors = stats.order("close_button", CLOSE_BUTTON_SELECTORS) if stats else CLOSE_BUTTON_SELECTORS
+    # Esperar a que el botón se renderice en vez de un sleep fijo
+    await wait_for_selector(page, timer, "review_button", ", ".join(button_selectors[:2]),
+                            REVIEW_BUTTON_TIMEOUT_MS)
+
+    review_btn = await _probe(page, stats, "review_button", button_selectors)
+    if not review_btn:
+        return False
+
+    try:
+        # Cerrar modal de traducción si está abierto (tapa el botón de reseñas)
+        close_btn = await _probe(page, stats, "close_button", close_selectors)
+        if close_btn:
+            try:
+                await close_btn.click()
+                await wait_for_hidden(close_btn, timer, "close", CLOSE_TIMEOUT_MS)
+            except Exception:
+                pass
+
+        # Scroll hasta el botón y click via dispatchEvent para evitar
+        # el error "element is outside of the viewport"
+        await review_btn.scroll_into_view_if_needed()
+        await review_btn.dispatch_event("click")
+    except Exception:
+        return False
+    return await wait_for_review_dialog(page, timer)
+
+
+def apply_fields(result: ListingResult, fields: dict) -> ListingResult:
+    result.rating = fields["rating"]
+    result.review_count = fields["review_count"]
+    result.title = fields["title"]
+    result.last_5_reviews = fields["reviews"]
+    result.status = "success" if (result.rating is not None or result.review_count is not None) else "no_data"
+    result.fingerprint = fingerprint(result.rating, result.review_count, result.last_5_reviews)
+    result.scraped_at = now_iso()
+    return result
+
+
+def mark_changed(result: ListingResult, previous: Optional[dict]):
+    # Sin registro anterior todo cuenta como cambio; si no cambió se conservan
+    # los insights de IA de la corrida anterior
+    if result.status not in ("success", "no_data"):
+        return
+    result.changed = previous is None or previous.get("fingerprint") != result.fingerprint
+    if not result.changed:
+        result.highlight = result.highlight or previous.get("highlight")
+        result.opportunity = result.opportunity or previous.get("opportunity")
+
+
+async def scrape_listing(page, url: str, archive: Optional[SnapshotArchive] = None,
+                         selector_stats: Optional[SelectorStats] = None,
+                         previous: Optional[dict] = None) -> ListingResult:
+    from playwright.async_api import TimeoutError as PWTimeout
+
     listing_id = extract_listing_id(url)
     result = ListingResult(url=url, listing_id=listing_id)
+    timer = StageTimer()
+    result.timings = timer.timings
+    # Reseñas y rating desde las respuestas JSON de la propia página
+    capture = ResponseCapture()
+    capture.attach(page)
 
     try:
         await page.set_extra_http_headers({
@@ -78,226 +247,60 @@ async def scrape_listing(page, url: str) -> ListingResult:
         })
 
         log.info(f"Obteniendo {url}")
+        started = time.perf_counter()
         await page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT)
-        await page.wait_for_timeout(random.randint(2000, 4000))
+        timer.record("goto", started)
+        await wait_for_listing(page, timer, BLOCK_MARKERS)
 
-        body_text = await page.inner_text("body")
-        if any(kw in body_text.lower() for kw in ["captcha", "robot", "access denied", "unusual traffic"]):
+        if await is_blocked(page):
             result.status = "blocked"
             result.error_message = "Bot detection triggered"
             log.warning(f"Blocked on {url}")
             return result
 
-        # ── Rating
-        rating = None
-        try:
-            json_ld_elements = await page.query_selector_all('script[type="application/ld+json"]')
-            for el in json_ld_elements:
-                raw = await el.inner_text()
-                data = json.loads(raw)
-                items = data if isinstance(data, list) else [data]
-                for item in items:
-                    if "aggregateRating" in item:
-                        rating = float(item["aggregateRating"].get("ratingValue", 0))
-                        break
-                if rating:
-                    break
-        except Exception:
-            pass
-
-        if not rating:
-            for selector in [
-                '[data-testid="pdp-reviews-highlight-banner-host-rating"] span',
-                'span[aria-label*="out of 5"]',
-                '._17p6nbba',
-                'span.r1lutz1s',
-            ]:
+        started = time.perf_counter()
+        await capture.settle()
+        timer.record("network", started)
+
+        fields = None
+        carried = False
+        if previous is not None:
+            # Refresco: si rating y cantidad no cambiaron se reusan las reseñas
+            # anteriores y no se abre el modal
+            started = time.perf_counter()
+            payload = await extract_page_data(page, selector_stats)
+            fields = capture.merge(parse_payload(payload))
+            carried = is_unchanged(previous, fields)
+            fields = carry_over(previous, fields) if carried else None
+            timer.record("fingerprint", started)
+
+        if fields is None:
+            # El click + espera del modal solo si la página no cargó ya las reseñas
+            if not capture.reviews:
                 try:
-                    el = await page.query_selector(selector)
-                    if el:
-                        text = await el.inner_text()
-                        m = re.search(r"(\d+\.\d+)", text)
-                        if m:
-                            rating = float(m.group(1))
-                            break
-                except Exception:
-                    continue
-
-        result.rating = rating
-
-        # ── Review Count
-        review_count = None
-        try:
-            json_ld_elements = await page.query_selector_all('script[type="application/ld+json"]')
-            for el in json_ld_elements:
-                raw = await el.inner_text()
-                data = json.loads(raw)
-                items = data if isinstance(data, list) else [data]
-                for item in items:
-                    if "aggregateRating" in item:
-                        review_count = int(item["aggregateRating"].get("reviewCount", 0))
-                        break
-                if review_count is not None:
-                    break
-        except Exception:
-            pass
-
-        if not review_count:
-            for selector in [
-                'a[href*="reviews"] span',
-                '[data-testid="pdp-reviews-highlight-banner-host-rating"] button',
-                'button[data-testid*="review"]',
-                '._s65ijh7',
-            ]:
-                try:
-                    el = await page.query_selector(selector)
-                    if el:
-                        text = await el.inner_text()
-                        m = re.search(r"(\d[\d,]*)", text)
-                        if m:
-                            review_count = int(m.group(1).replace(",", ""))
-                            break
-                except Exception:
-                    continue
-
-        result.review_count = review_count
-
-        # ── Title
-        try:
-            el = await page.query_selector("h1")
-            if el:
-                result.title = (await el.inner_text()).strip()
-        except Exception:
-            pass
-
-        # ── Reviews (3 capas de fallback)
-        reviews = []
-        try:
-            review_btn = None
-            for btn_selector in [
-                'button[data-testid="pdp-show-all-reviews-button"]',
-                'a[data-testid="pdp-show-all-reviews-button"]',
-                'button:has-text("Show all")',
-                'button:has-text("reviews")',
-            ]:
-                try:
-                    review_btn = await page.query_selector(btn_selector)
-                    if review_btn:
-                        break
-                except Exception:
-                    continue
-
-            if review_btn:
-                try:
-                    # Cerrar modal de traducción si está abierto (tapa el botón de reseñas)
-                    for close_sel in [
-                        'button[aria-label="Close"]',
-                        'button[aria-label="Cerrar"]',
-                        'div[role="dialog"] button:has-text("Got it")',
-                        'div[role="dialog"] button:has-text("OK")',
-                        'div[role="dialog"] button:has-text("Close")',
-                    ]:
-                        try:
-                            close_btn = await page.query_selector(close_sel)
-                            if close_btn:
-                                await close_btn.click()
-                                await page.wait_for_timeout(500)
-                                break
-                        except Exception:
-                            continue
-
-                    # Scroll hasta el botón y click via dispatchEvent para evitar
-                    # el error "element is outside of the viewport"
-                    await review_btn.scroll_into_view_if_needed()
-                    await page.wait_for_timeout(500)
-                    await review_btn.dispatch_event("click")
-                    await page.wait_for_timeout(3000)
-                except Exception:
-                    pass
-
-            # Palabras que indican que el texto es un rating, no una reseña
-            EXCLUDE_PREFIXES = (
-                "rated ", "overall rating", "accuracy", "check-in",
-                "cleanliness", "communication", "location", "value",
-            )
-
-            text_selectors = [
-                # Selector confirmado funcionando via debug_modal.py
-                'div[role="dialog"] span',
-                'div[role="dialog"] div > span',
-                '[data-testid="review-card"] span[style*="-webkit-line-clamp"]',
-                '[data-testid="review-card"] span',
-                'div[role="dialog"] li span[style]',
-                'div[role="dialog"] li span',
-                'section[data-testid*="review"] span[style*="-webkit-line-clamp"]',
-                'li[class*="review"] span',
-                '._1gjypya',
-                '.r1bctolv span',
-                '[data-section-id="REVIEWS"] li span',
-                '[data-section-id="REVIEWS"] p',
-            ]
-
-            for sel in text_selectors:
-                if reviews:
-                    break
-                try:
-                    els = await page.query_selector_all(sel)
-                    seen = set()
-                    for el in els:
-                        try:
-                            text = (await el.inner_text()).strip()
-                            # Normalizar: colapsar saltos de linea en espacio
-                            text_clean = " ".join(text.split())
-                            # Filtros: longitud real de reseña y no es texto de rating
-                            if (text_clean
-                                    and 40 < len(text_clean) < 2000
-                                    and text_clean not in seen
-                                    and not text_clean.lower().startswith(EXCLUDE_PREFIXES)):
-                                seen.add(text_clean)
-                                reviews.append(text_clean)
-                            if len(reviews) >= 5:
-                                break
-                        except Exception:
-                            continue
-                except Exception:
-                    continue
-
-            if not reviews:
-                try:
-                    next_data_el = await page.query_selector('#__NEXT_DATA__')
-                    if next_data_el:
-                        raw_json = await next_data_el.inner_text()
-                        comment_matches = re.findall(
-                            r'"comments"\s*:\s*"((?:[^"\\]|\\.){30,500})"',
-                            raw_json
-                        )
-                        for c in comment_matches[:5]:
-                            try:
-                                reviews.append(bytes(c, "utf-8").decode("unicode_escape"))
-                            except Exception:
-                                reviews.append(c)
-
-                        if not reviews:
-                            body_matches = re.findall(
-                                r'"reviewBody"\s*:\s*"((?:[^"\\]|\\.){30,500})"',
-                                raw_json
-                            )
-                            for b in body_matches[:5]:
-                                try:
-                                    reviews.append(bytes(b, "utf-8").decode("unicode_escape"))
-                                except Exception:
-                                    reviews.append(b)
-                except Exception:
-                    pass
-
-        except Exception as e:
-            log.debug(f"Review extraction failed for {url}: {e}")
-
-        result.last_5_reviews = reviews[:5]
-
-        result.status = "success" if (rating is not None or review_count is not None) else "no_data"
-        result.scraped_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-        log.info(f"[OK] {listing_id} - rating={rating}, reviews={review_count}, texts={len(reviews)}")
+                    await open_reviews_dialog(page, timer, selector_stats)
+                except Exception as e:
+                    log.debug(f"Review dialog failed for {url}: {e}")
+                await capture.settle()
+
+            # Todo lo demás sale de un único page.evaluate
+            started = time.perf_counter()
+            payload = await extract_page_data(page, selector_stats)
+            fields = capture.merge(parse_payload(payload))
+            timer.record("extract", started)
+        apply_fields(result, fields)
+
+        if archive is not None:
+            started = time.perf_counter()
+            # Sin modal la página no tiene las reseñas: van las reusadas, si no
+            # --reextract las perdería
+            network = {"reviews": fields["reviews"] if carried else capture.reviews,
+                       "rating": capture.rating, "review_count": capture.review_count}
+            html = await page.content()
+            await asyncio.to_thread(archive.save, listing_id, url, html, payload, network)
+            timer.record("snapshot", started)
+        log.info(f"[OK] {listing_id} - rating={result.rating}, reviews={result.review_count}, "
+                 f"texts={len(result.last_5_reviews)} ({timer.summary()})")
 
     except PWTimeout:
         result.status = "error"
@@ -308,47 +311,11 @@ async def scrape_listing(page, url: str) -> ListingResult:
         result.error_message = str(e)[:200]
         log.error(f"Error scraping {url}: {e}")
 
-    return result
-
-
-# ── AI Insights
-
-def generate_ai_insights(result: ListingResult) -> ListingResult:
-    if not AI_ENABLED or not result.last_5_reviews:
-        return result
-
-    client = anthropic.Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
-    reviews_text = "\n\n".join(
-        f"Review {i+1}: {r}" for i, r in enumerate(result.last_5_reviews)
-    )
-
-    prompt = f"""You are analyzing guest reviews for an Airbnb listing.
-
-Reviews:
-{reviews_text}
-
-Based solely on these reviews, provide:
-1. HIGHLIGHT: One specific characteristic that guests love most (be concrete, e.g. "Stunning ocean views from the rooftop terrace" not "great location").
-2. OPPORTUNITY: One specific improvement guests mention (or "None mentioned" if reviews are uniformly positive).
-
-Respond in this exact JSON format with no other text:
-{{"highlight": "...", "opportunity": "..."}}"""
-
-    try:
-        response = client.messages.create(
-            model=AI_MODEL,
-            max_tokens=300,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        raw = response.content[0].text.strip()
-        raw = re.sub(r"^```json\s*|```$", "", raw, flags=re.MULTILINE).strip()
-        insights = json.loads(raw)
-        result.highlight = insights.get("highlight")
-        result.opportunity = insights.get("opportunity")
-        log.info(f"AI insights generados para {result.listing_id}")
-    except Exception as e:
-        log.warning(f"AI insight failed for {result.listing_id}: {e}")
+    finally:
+        capture.detach(page)
 
+    if timer.timeouts:
+        log.debug(f"Deadlines vencidos en {listing_id}: {', '.join(timer.timeouts)}")
     return result
 
 
@@ -359,95 +326,226 @@ CSV_FIELDS = [
     "highlight", "opportunity", "error_message", "scraped_at",
 ]
 
+PARQUET_COLUMNS = {
+    "listing_id": "string", "url": "string", "status": "string", "title": "string",
+    "rating": "double", "review_count": "int64", "last_5_reviews": "list<string>",
+    "highlight": "string", "opportunity": "string", "error_message": "string",
+    "scraped_at": "string", "fingerprint": "string", "changed": "bool",
+    "last_attempt_status": "string", "last_attempt_at": "string", "timings": "json",
+}
 
-def save_outputs(results: list[ListingResult]):
-    Path("output").mkdir(exist_ok=True)
-
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
-        writer.writeheader()
-        for r in results:
-            row = asdict(r)
-            writer.writerow({k: row.get(k) for k in CSV_FIELDS})
 
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump([asdict(r) for r in results], f, indent=2, ensure_ascii=False)
-
-    log.info(f"Guardados {len(results)} registros en {OUTPUT_CSV} y {OUTPUT_JSON}")
+def open_sinks(since: Optional[str] = None) -> MultiSink:
+    # since: inicio de la corrida, para separar lo re-scrapeado de lo salteado por checkpoint
+    since = since or now_iso()
+    sinks = [CsvSink(OUTPUT_CSV, CSV_FIELDS), JsonArraySink(OUTPUT_JSON), JsonlSink(OUTPUT_JSONL),
+             FilteredSink(JsonlSink(OUTPUT_DELTA), lambda row: is_delta(row, since))]
+    if OUTPUT_PARQUET:
+        sink = parquet_sink(OUTPUT_PARQUET, PARQUET_COLUMNS)
+        if sink:
+            sinks.append(sink)
+    return MultiSink(sinks)
 
 
 # ── Orquestación principal
 
-async def process_batch(urls: list[str], checkpoint: dict) -> list[ListingResult]:
-    results = []
-    semaphore = asyncio.Semaphore(CONCURRENCY)
+async def process_batch(urls: Iterable[str], checkpoint: CheckpointStore, sink: Optional[MultiSink] = None,
+                        ai_client=None, insights_cache: Optional[InsightsCache] = None,
+                        ai_mode: str = AI_MODE, ai_pack_size: int = AI_PACK_SIZE,
+                        on_done: Optional[Callable[[ListingResult], None]] = None,
+                        archive: Optional[SnapshotArchive] = None,
+                        metrics_dir: str = METRICS_DIR,
+                        history: Optional[CheckpointStore] = None,
+                        browser_endpoint: Optional[str] = None,
+                        on_start: Optional[Callable[[str], bool]] = None) -> RunSummary:
+    # Los resultados no quedan en memoria: van al checkpoint y al sink apenas terminan
+    # history: de dónde leer la corrida anterior (por defecto el mismo checkpoint)
+    # on_start: se llama al sacar cada listing de la cola; False = no procesarlo
+    history = checkpoint if history is None else history
+    freshness = FreshnessPolicy()
+    summary = RunSummary(keep_ids=sink is None, metrics=RunMetrics())
+    route_policy = RoutePolicy() if BLOCK_RESOURCES else None
+    http_fetcher = HttpFetcher(USER_AGENTS, max_connections=CONCURRENCY * 2) if HTTP_FIRST else None
+    if http_fetcher and not http_fetcher.start():
+        http_fetcher = None
+    # Orden de las cascadas de selectores aprendido en corridas anteriores
+    selector_stats = SelectorStats(SELECTOR_STATS_FILE).load()
+
+    def emit(result: ListingResult):
+        if sink is not None:
+            sink.write(asdict(result))
+        summary.add(result)
+        if on_done is not None:
+            on_done(result)
+
+    def finish(result: ListingResult):
+        checkpoint.put(result.listing_id, asdict(result))
+        # Solo lo procesado en esta corrida (no lo salteado por checkpoint)
+        summary.metrics.observe(result)
+        emit(result)
+
+    def keep_previous(result: ListingResult, entry: Optional[dict]) -> bool:
+        # Un refresco fallido no pisa datos buenos: sigue vencido y se vuelve
+        # a intentar en la próxima corrida. no_data también cuenta: una página
+        # throttleada vuelve incompleta y borraría rating, reseñas e insights
+        if result.status not in ("error", "blocked", "no_data") or not entry or entry.get("status") != "success":
+            return False
+        log.warning(f"Refresco de {result.listing_id} terminó en {result.status}, se conserva el registro anterior")
+        summary.metrics.observe(result)
+        kept = ListingResult(**{**entry, "last_attempt_status": result.status, "last_attempt_at": now_iso()})
+        checkpoint.put(kept.listing_id, asdict(kept))
+        emit(kept)
+        return True
+
+    def record_crash(url: str, error: Exception):
+        # El handler lanzó en todos los intentos: queda como error, no como terminado
+        listing_id = extract_listing_id(url)
+        result = ListingResult(url=url, listing_id=listing_id, status="error",
+                               error_message=str(error)[:200])
+        if not keep_previous(result, history.get(listing_id)):
+            finish(result)
+
+    enricher = None
+    if ai_mode == "online" and (AI_ENABLED or ai_client is not None):
+        enricher = AIEnricher(on_done=finish, client=ai_client, cache=insights_cache, pack_size=ai_pack_size)
+        enricher.start()
+
+    async def new_context(browser):
+        return await browser.new_context(
+            user_agent=random.choice(USER_AGENTS),
+            viewport={"width": 1280, "height": 800},
+            locale="en-US",
+        )
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-blink-features=AutomationControlled",
-                "--disable-dev-shm-usage",
-            ],
+    async def setup_context(context, page):
+        if route_policy:
+            await route_policy.attach(context)
+        await page.add_init_script(
+            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
         )
 
-        async def handle_url(url: str):
-            listing_id = extract_listing_id(url)
+    # Playwright se importa recién acá: --reextract y el tier HTTP no lo cargan
+    from playwright.async_api import async_playwright
 
-            if listing_id in checkpoint and checkpoint[listing_id]["status"] in ("success", "blocked"):
-                log.info(f"Saltando (checkpoint): {listing_id}")
-                r = ListingResult(**checkpoint[listing_id])
-                results.append(r)
-                return
-
-            async with semaphore:
-                context = await browser.new_context(
-                    user_agent=random.choice(USER_AGENTS),
-                    viewport={"width": 1280, "height": 800},
-                    locale="en-US",
-                )
-                page = await context.new_page()
-
-                await page.add_init_script(
-                    "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-                )
-
-                result = None
-                for attempt in range(1, MAX_RETRIES + 1):
-                    result = await scrape_listing(page, url)
-                    if result.status != "error":
-                        break
-                    if attempt < MAX_RETRIES:
-                        wait = random.uniform(5, 10)
-                        log.info(f"Reintento {attempt} para {url} en {wait:.1f}s")
-                        await asyncio.sleep(wait)
-
-                await context.close()
-
-                if AI_ENABLED and result.last_5_reviews:
-                    result = generate_ai_insights(result)
-
-                checkpoint[listing_id] = asdict(result)
-                save_checkpoint(checkpoint)
-                results.append(result)
-
-                await asyncio.sleep(random.uniform(*REQUEST_DELAY))
-
-        await asyncio.gather(*[handle_url(u) for u in urls])
+    async with async_playwright() as p:
+        browser, summary.metrics.browser_mode = await open_browser(
+            p, browser_endpoint or (service_endpoint() if USE_BROWSER_SERVICE else None))
+        summary.metrics.mark_startup("browser")
+        log.info(f"Browser listo ({summary.metrics.browser_mode}) a los "
+                 f"{summary.metrics.startup['browser']:.1f}s del arranque")
+        # El pool arranca con CONCURRENCY páginas y puede crecer hasta el máximo
+        # del controlador; el controlador decide cuántas hay en vuelo
+        max_pages = CONCURRENCY_MAX if ADAPTIVE_CONCURRENCY else CONCURRENCY
+        controller = ConcurrencyController(CONCURRENCY, CONCURRENCY_MIN, max_pages) if ADAPTIVE_CONCURRENCY else None
+        pool = PagePool(browser, max_pages, new_context, setup_context)
+        await pool.start(warm=CONCURRENCY)
+        summary.metrics.start_sampler(pool, (lambda: controller.in_flight) if controller else None)
+
+        rate_limiter = RateLimiter(REQUEST_RATE)
+
+        async def handle_url(url: str, attempt: int) -> bool:
+            listing_id = extract_listing_id(url)
+            if on_start is not None and not on_start(listing_id):
+                log.warning(f"Lease de {listing_id} vencido y tomado por otro worker, se saltea")
+                return False
+
+            entry = history.get(listing_id)
+            if attempt == 1 and freshness.is_fresh(entry):
+                log.info(f"Saltando (fresco): {listing_id}")
+                emit(ListingResult(**entry))
+                return False
+            # Registro contra el que detectar cambios al refrescar
+            previous = freshness.previous(entry)
+
+            # La espera de cortesía se hace antes de tomar una página, no con el slot ocupado
+            await rate_limiter.acquire()
+
+            result = None
+            if http_fetcher and attempt == 1:
+                started = time.perf_counter()
+                fields = await http_fetcher.fetch_fields(url, previous)
+                if fields is not None:
+                    result = apply_fields(ListingResult(url=url, listing_id=listing_id), fields)
+                    result.timings = {"http": round((time.perf_counter() - started) * 1000, 1)}
+                    log.info(f"[OK/http] {listing_id} - rating={result.rating}, "
+                             f"reviews={result.review_count}, texts={len(result.last_5_reviews)}")
+                else:
+                    # El fallback al browser es otro request al sitio
+                    await rate_limiter.acquire()
+
+            if result is None:
+                if http_fetcher:
+                    http_fetcher.stats.browser += 1
+                if controller is None:
+                    async with pool.checkout() as slot:
+                        result = await scrape_listing(slot.page, url, archive, selector_stats, previous)
+                        # Un context que terminó en error se recicla en vez de reutilizarse
+                        slot.healthy = result.status != "error"
+                else:
+                    async with controller.slot():
+                        started = time.perf_counter()
+                        async with pool.checkout() as slot:
+                            result = await scrape_listing(slot.page, url, archive, selector_stats, previous)
+                            slot.healthy = result.status != "error"
+                    if controller.observe(result.status, time.perf_counter() - started, slot.heap_mb):
+                        await pool.shrink(controller.limit)
+
+            if "first_page" not in summary.metrics.startup:
+                summary.metrics.mark_startup("first_page")
+                log.info(f"Primer listing a los {summary.metrics.startup['first_page']:.1f}s del arranque")
+
+            if result.status == "error" and attempt < MAX_RETRIES:
+                # El scheduler lo re-encola con backoff sin ocupar un worker
+                return True
+
+            if keep_previous(result, entry):
+                return False
+
+            mark_changed(result, entry)
+            # El slot ya se liberó: la IA corre en su propia etapa. Un listing sin
+            # cambios conserva sus insights; si no tenía (p.ej. se scrapeó sin
+            # API key) se piden igual y el cache de insights los abarata
+            if enricher and result.last_5_reviews and not result.highlight:
+                await enricher.submit(result)
+            else:
+                finish(result)
+            return False
+
+        scheduler = Scheduler(handle_url, workers=max_pages, max_attempts=MAX_RETRIES, on_error=record_crash)
+        await scheduler.run(urls)
+        log.info(f"Scheduler: {scheduler.retries} reintentos, {scheduler.failed} con error no controlado, "
+                 f"{rate_limiter.waited:.0f}s de espera por rate limit")
+        if controller is not None:
+            log.info(f"Concurrencia: {controller.summary()}")
+        await summary.metrics.stop_sampler()
+        summary.metrics.sample_memory(pool)
+        await pool.close()
+        # Con el servicio solo se desconecta; el Chromium sigue vivo para la próxima corrida
         await browser.close()
 
-    return results
-
-
-def print_summary(results: list[ListingResult]):
-    total = len(results)
-    success = sum(1 for r in results if r.status == "success")
-    no_data = sum(1 for r in results if r.status == "no_data")
-    errors = sum(1 for r in results if r.status == "error")
-    blocked = sum(1 for r in results if r.status == "blocked")
-    with_reviews = sum(1 for r in results if r.last_5_reviews)
-    with_ai = sum(1 for r in results if r.highlight)
+    if enricher:
+        await enricher.close()
+
+    selector_stats.save(SELECTOR_REPORT_FILE)
+    if route_policy:
+        log.info(f"Routing: {route_policy.stats.summary()}")
+    if http_fetcher:
+        await http_fetcher.close()
+        log.info(f"Tiers: {http_fetcher.stats.summary()}")
+        summary.tiers = http_fetcher.stats
+    summary.metrics.export(metrics_dir)
+    return summary
+
+
+def print_summary(summary: RunSummary, insights_cache: Optional[InsightsCache] = None,
+                  metrics_table: bool = False):
+    total = summary.total
+    success = summary.counts["success"]
+    no_data = summary.counts["no_data"]
+    errors = summary.counts["error"]
+    blocked = summary.counts["blocked"]
+    with_reviews = summary.with_reviews
+    with_ai = summary.with_ai
 
     print("\n" + "=" * 50)
     print("  Resumen del proceso:")
@@ -459,23 +557,264 @@ def print_summary(results: list[ListingResult]):
     print(f"  Blocked               : {blocked}")
     print(f"  Con texto de reseñas  : {with_reviews}")
     print(f"  Con AI insights       : {with_ai}")
+    print(f"  Refrescados sin cambio: {summary.unchanged}")
+    if insights_cache is not None:
+        print(f"  Cache de insights     : {insights_cache.summary()}")
+    if summary.tiers is not None:
+        print(f"  Tiers de fetch        : {summary.tiers.summary()}")
+    if summary.metrics is not None and summary.metrics.startup:
+        startup = ", ".join(f"{k} {v:.1f}s" for k, v in summary.metrics.startup.items())
+        print(f"  Arranque ({summary.metrics.browser_mode}) : {startup}")
     print("=" * 50)
     print(f"  Output CSV  : {OUTPUT_CSV}")
     print(f"  Output JSON : {OUTPUT_JSON}")
+    print(f"  Output JSONL: {OUTPUT_JSONL}")
+    print(f"  Delta       : {OUTPUT_DELTA}")
+    print(f"  Selectores  : {SELECTOR_REPORT_FILE}")
+    if summary.metrics is not None:
+        print(f"  Métricas    : {METRICS_DIR}/{METRICS_JSON}, {METRICS_DIR}/{METRICS_PROM}")
+        if metrics_table:
+            print("=" * 50)
+            print(summary.metrics.table())
     print("=" * 50 + "\n")
 
 
-async def main():
-    Path("output").mkdir(exist_ok=True)
-    urls = load_urls(INPUT_FILE)
-    log.info(f"Cargadas {len(urls)} URLs desde {INPUT_FILE}")
+# ── Modo multi-proceso
+
+def default_lease_db() -> str:
+    # Un store por día: las corridas diarias no se pisan y varias máquinas
+    # que comparten el volumen ese día se reparten los mismos listings
+    return f"output/leases-{time.strftime('%Y%m%d')}.sqlite"
 
-    checkpoint = load_checkpoint()
+
+async def run_worker(worker_id: str, lease_db: str, ai_mode: str, snapshots: bool = False,
+                     ai_pack_size: int = AI_PACK_SIZE, browser_endpoint: Optional[str] = None):
+    worker_dir = Path(WORKERS_DIR) / worker_id
+    store = LeaseStore(lease_db)
+    checkpoint = load_checkpoint(str(worker_dir / "checkpoint.json"))
+    # Checkpoint principal solo de lectura (detección de cambios); no se cierra
+    # porque close() compactaría un archivo que es del proceso padre
+    history = load_checkpoint(CHECKPOINT_FILE)
+    insights_cache = InsightsCache(INSIGHTS_CACHE_FILE) if AI_ENABLED and ai_mode == "online" else None
+    sink = MultiSink([JsonlSink(str(worker_dir / "listings_output.jsonl"))])
+
+    try:
+        summary = await process_batch(
+            store.leased_urls(worker_id), checkpoint, sink=sink,
+            insights_cache=insights_cache, ai_mode=ai_mode, ai_pack_size=ai_pack_size,
+            on_done=lambda r: store.complete(r.listing_id, worker_id),
+            on_start=lambda listing_id: store.renew(listing_id, worker_id),
+            archive=SnapshotArchive(SNAPSHOT_DIR) if snapshots else None,
+            metrics_dir=str(worker_dir), history=history, browser_endpoint=browser_endpoint,
+        )
+        log.info(f"Worker {worker_id}: {summary.total} listings")
+    finally:
+        sink.close()
+        checkpoint.close()
+        store.close()
+        if insights_cache is not None:
+            # El padre no ve el cache de este proceso: deja los contadores para el resumen
+            (worker_dir / WORKER_CACHE_STATS).write_text(
+                json.dumps({"hits": insights_cache.hits, "misses": insights_cache.misses}))
+            insights_cache.close()
+
+
+def worker_process(worker_id: str, lease_db: str, ai_mode: str, snapshots: bool = False,
+                   ai_pack_size: int = AI_PACK_SIZE, browser_endpoint: Optional[str] = None):
+    # Cada worker lanza su propio Chromium (un proceso de browser por worker es
+    # lo que da el paralelismo); solo comparten uno si se pasa --browser-endpoint
+    global USE_BROWSER_SERVICE
+    USE_BROWSER_SERVICE = False
+    setup_logging()
+    asyncio.run(run_worker(worker_id, lease_db, ai_mode, snapshots, ai_pack_size, browser_endpoint))
+
+
+def merge_worker_checkpoints(checkpoint: CheckpointStore, worker_ids: Iterable[str]) -> int:
+    # Solo los workers de esta corrida: con el volumen compartido, las carpetas
+    # de otras máquinas pueden ser de workers que todavía están corriendo
+    merged = 0
+    for folder in (Path(WORKERS_DIR) / worker_id for worker_id in worker_ids):
+        # Un worker caído antes de compactar deja solo el journal: load() lo
+        # reaplica igual, así que se mira cualquiera de los archivos
+        worker_cp = CheckpointStore(str(folder / "checkpoint.json"))
+        files = (worker_cp.path, worker_cp.rotated_path, worker_cp.journal_path)
+        if not any(p.exists() for p in files):
+            continue
+        worker_cp.load()
+        for record in worker_cp.values():
+            checkpoint.put(record["listing_id"], record)
+            merged += 1
+        # Ya está en el checkpoint principal: borrarlo evita que un merge
+        # futuro pise datos más nuevos con estos
+        for p in files:
+            if p.exists():
+                p.unlink()
+    return merged
+
+
+def merge_worker_cache_stats(insights_cache: InsightsCache, worker_ids: Iterable[str]):
+    for worker_id in worker_ids:
+        path = Path(WORKERS_DIR) / worker_id / WORKER_CACHE_STATS
+        if not path.exists():
+            continue
+        try:
+            stats = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            log.warning(f"No se pudieron leer los contadores de cache de {worker_id}: {e}")
+            continue
+        insights_cache.hits += stats.get("hits", 0)
+        insights_cache.misses += stats.get("misses", 0)
+        path.unlink()
+
+
+async def run_multiprocess(args, checkpoint: CheckpointStore, urls: Iterable[str],
+                           insights_cache: Optional[InsightsCache]) -> RunSummary:
+    started_at = now_iso()
+    freshness = FreshnessPolicy()
+    store = LeaseStore(args.lease_db)
+    seeded = store.seed(
+        (extract_listing_id(u), u, checkpoint.should_skip(extract_listing_id(u), freshness)) for u in urls
+    )
+    log.info(f"Lease store {args.lease_db}: {seeded} listings nuevos o vencidos, estado {store.counts()}")
+
+    ctx = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    worker_ids = [f"{host}-{i}" for i in range(args.workers)]
+    procs = [
+        ctx.Process(target=worker_process,
+                    args=(worker_id, args.lease_db, args.ai_mode, args.snapshots, args.ai_pack_size,
+                          args.browser_endpoint))
+        for worker_id in worker_ids
+    ]
+    for proc in procs:
+        proc.start()
+    await asyncio.gather(*[asyncio.to_thread(proc.join) for proc in procs])
+    failed = [proc.exitcode for proc in procs if proc.exitcode]
+    if failed:
+        log.error(f"{len(failed)} workers terminaron con error: {failed}")
+
+    merged = merge_worker_checkpoints(checkpoint, worker_ids)
+    if insights_cache is not None:
+        merge_worker_cache_stats(insights_cache, worker_ids)
+    log.info(f"Merge: {merged} registros de workers, estado final {store.counts()}")
+
+    # Salidas en el orden del input, incluyendo los listings salteados por checkpoint
+    results = (ListingResult(**checkpoint[lid]) for lid in store.listing_ids() if lid in checkpoint)
+    summary = RunSummary()
+    sink = open_sinks(since=started_at)
+    try:
+        if AI_ENABLED and args.ai_mode == "batch":
+            results = list(results)
+            await BatchEnricher(checkpoint, cache=insights_cache).run(results)
+        for r in results:
+            sink.write(asdict(r))
+            summary.add(r)
+    finally:
+        sink.close()
+        store.close()
+    return summary
+
+
+# ── Re-extracción offline
+
+def run_reextract(args, checkpoint: CheckpointStore) -> RunSummary:
+    # Sin red: reconstruye los campos desde los snapshots y conserva lo que no
+    # sale de la página (insights de IA, etc.) del checkpoint
+    summary = RunSummary()
+    sink = open_sinks()
+    try:
+        for fields in reextract(SNAPSHOT_DIR, workers=args.reextract_workers):
+            record = {**(checkpoint.get(fields["listing_id"]) or {}), **fields}
+            record["fingerprint"] = fingerprint(record["rating"], record["review_count"], record["last_5_reviews"])
+            result = ListingResult(**record)
+            checkpoint.put(result.listing_id, asdict(result))
+            sink.write(asdict(result))
+            summary.add(result)
+    finally:
+        sink.close()
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Airbnb ETL pipeline")
+    parser.add_argument("--input", default=INPUT_FILE,
+                        help="archivo de URLs (.gz soportado) o '-' para stdin")
+    parser.add_argument("--ai-mode", choices=["online", "batch"], default=AI_MODE,
+                        help="online: insights por listing durante el scraping; batch: Message Batches al final")
+    parser.add_argument("--ai-pack-size", type=int, default=AI_PACK_SIZE,
+                        help="listings por request de IA en modo online (1 = un request por listing)")
+    parser.add_argument("--browser-endpoint", default=None,
+                        help="endpoint CDP de un Chromium ya corriendo (default: el de browser_service.py si está vivo)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="cantidad de procesos worker, cada uno con su propio browser (0 = un solo proceso)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help=f"guardar el DOM final y el JSON embebido de cada listing en {SNAPSHOT_DIR}")
+    parser.add_argument("--reextract", action="store_true",
+                        help="re-extraer los campos desde los snapshots guardados, sin red")
+    parser.add_argument("--reextract-workers", type=int, default=None,
+                        help="procesos para --reextract (default: uno por core)")
+    parser.add_argument("--metrics-table", action="store_true",
+                        help="mostrar p50/p95/p99 por etapa, páginas/min y memoria al final")
+    parser.add_argument("--lease-db", default=default_lease_db(),
+                        help="store SQLite compartido para repartir listings entre workers/máquinas")
+    return parser.parse_args(argv)
+
+
+async def main():
+    setup_logging()
+    args = parse_args()
+    # Lectura lazy + dedupe por listing_id: nunca se carga el archivo entero
+    seen = SeenSet()
+    urls = unique_urls(iter_urls(args.input), seen)
+    log.info(f"Leyendo URLs desde {args.input}")
+
+    checkpoint = load_checkpoint(CHECKPOINT_FILE)
     log.info(f"Checkpoint: {len(checkpoint)} URLs previamente procesadas")
 
-    results = await process_batch(urls, checkpoint)
-    save_outputs(results)
-    print_summary(results)
+    if args.reextract:
+        try:
+            summary = run_reextract(args, checkpoint)
+        finally:
+            checkpoint.close()
+        print_summary(summary)
+        return
+
+    insights_cache = InsightsCache(INSIGHTS_CACHE_FILE) if AI_ENABLED else None
+
+    if args.workers > 0:
+        try:
+            summary = await run_multiprocess(args, checkpoint, urls, insights_cache)
+        finally:
+            checkpoint.close()
+            if insights_cache is not None:
+                insights_cache.close()
+        print_summary(summary, insights_cache)
+        return
+
+    batch_ai = AI_ENABLED and args.ai_mode == "batch"
+    sink = open_sinks()
+
+    try:
+        # En modo batch las salidas se escriben después de integrar los insights
+        summary = await process_batch(urls, checkpoint, sink=None if batch_ai else sink,
+                                      insights_cache=insights_cache, ai_mode=args.ai_mode,
+                                      ai_pack_size=args.ai_pack_size,
+                                      browser_endpoint=args.browser_endpoint,
+                                      archive=SnapshotArchive(SNAPSHOT_DIR) if args.snapshots else None)
+        log.info(f"Procesadas {len(seen)} URLs únicas desde {args.input}")
+        if batch_ai:
+            results = [ListingResult(**checkpoint[lid]) for lid in summary.listing_ids]
+            await BatchEnricher(checkpoint, cache=insights_cache).run(results)
+            summary = RunSummary(metrics=summary.metrics)
+            for r in results:
+                sink.write(asdict(r))
+                summary.add(r)
+    finally:
+        sink.close()
+        checkpoint.close()
+        if insights_cache is not None:
+            insights_cache.close()
+    print_summary(summary, insights_cache, metrics_table=args.metrics_table)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+METRICS_DIR = "output"
+METRICS_JSON = "metrics.json"
+METRICS_PROM = "metrics.prom"
+# Cada cuánto se toma una muestra de memoria durante la corrida
+MEMORY_SAMPLE_S = 15.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def rss_mb() -> float:
+    # RSS del proceso Python; /proc en Linux, getrusage (pico) en el resto
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def process_uptime_s() -> Optional[float]:
+    # Segundos desde que arrancó el proceso (incluye intérprete e imports); solo Linux
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class RunMetrics:
+    # Agrega los `timings` por etapa de cada ListingResult (goto, ready,
+    # network, review_button, close, dialog, extract, snapshot, http, ai) y
+    # las muestras de memoria. Al final exporta JSON y texto Prometheus.
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages: dict[str, list[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.memory: list[dict] = []
+        # Segundos desde el arranque del proceso: browser listo, primer listing
+        self.startup: dict[str, float] = {}
+        self.browser_mode: Optional[str] = None
+        self._sampler: Optional[asyncio.Task] = None
+
+    def observe(self, result):
+        self.statuses[result.status] += 1
+        total = 0.0
+        for stage, ms in (result.timings or {}).items():
+            self.stages[stage].append(ms)
+            total += ms
+        self.stages["total"].append(round(total, 1))
+
+    def mark_startup(self, phase: str):
+        # Sin /proc se mide desde que se creó RunMetrics
+        if phase not in self.startup:
+            seconds = process_uptime_s()
+            if seconds is None:
+                seconds = time.monotonic() - self.started
+            self.startup[phase] = round(seconds, 3)
+
+    def sample_memory(self, pool=None, in_flight: Optional[int] = None):
+        sample = {"t": round(time.monotonic() - self.started, 1), "rss_mb": round(rss_mb(), 1)}
+        if pool is not None:
+            sample["browser_heap_mb"] = round(pool.heap_mb_total(), 1)
+            sample["contexts"] = pool.capacity
+        if in_flight is not None:
+            sample["in_flight"] = in_flight
+        self.memory.append(sample)
+
+    def start_sampler(self, pool=None, in_flight=None, interval: float = MEMORY_SAMPLE_S):
+        # in_flight: callable opcional que devuelve las páginas en vuelo
+        async def loop():
+            while True:
+                self.sample_memory(pool, in_flight() if in_flight else None)
+                await asyncio.sleep(interval)
+
+        self._sampler = asyncio.create_task(loop())
+
+    async def stop_sampler(self):
+        if self._sampler is not None:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+            self._sampler = None
+
+    @property
+    def completed(self) -> int:
+        return sum(self.statuses.values())
+
+    def pages_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def stage_summary(self) -> dict[str, dict]:
+        out = {}
+        for stage, values in self.stages.items():
+            ordered = sorted(values)
+            out[stage] = {
+                "count": len(ordered),
+                "sum_ms": round(sum(ordered), 1),
+                **{f"p{int(q * 100)}_ms": percentile(ordered, q) for q in QUANTILES},
+            }
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "completed": self.completed,
+            "pages_per_minute": round(self.pages_per_minute(), 2),
+            "statuses": dict(self.statuses),
+            "startup_s": self.startup,
+            "browser_mode": self.browser_mode,
+            "stages": self.stage_summary(),
+            "memory": self.memory,
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP etl_listings_total Listings terminados por status",
+            "# TYPE etl_listings_total counter",
+        ]
+        for status, count in sorted(self.statuses.items()):
+            lines.append(f'etl_listings_total{{status="{status}"}} {count}')
+        lines += [
+            "# HELP etl_pages_per_minute Throughput de la corrida",
+            "# TYPE etl_pages_per_minute gauge",
+            f"etl_pages_per_minute {self.pages_per_minute():.2f}",
+        ]
+        if self.startup:
+            lines += [
+                "# HELP etl_startup_seconds Segundos desde el arranque del proceso hasta cada hito",
+                "# TYPE etl_startup_seconds gauge",
+            ]
+            lines += [f'etl_startup_seconds{{phase="{phase}"}} {value:.3f}'
+                      for phase, value in sorted(self.startup.items())]
+        lines += [
+            "# HELP etl_stage_seconds Latencia por etapa de scrape_listing",
+            "# TYPE etl_stage_seconds summary",
+        ]
+        for stage, stats in sorted(self.stage_summary().items()):
+            for q in QUANTILES:
+                value = stats[f"p{int(q * 100)}_ms"] / 1000
+                lines.append(f'etl_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.4f}')
+            lines.append(f'etl_stage_seconds_sum{{stage="{stage}"}} {stats["sum_ms"] / 1000:.4f}')
+            lines.append(f'etl_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        if self.memory:
+            last = self.memory[-1]
+            lines += [
+                "# HELP etl_rss_megabytes RSS del proceso Python (última muestra)",
+                "# TYPE etl_rss_megabytes gauge",
+                f"etl_rss_megabytes {last['rss_mb']}",
+            ]
+            if "browser_heap_mb" in last:
+                lines += [
+                    "# HELP etl_browser_heap_megabytes Heap JS sumado de las páginas del pool (última muestra)",
+                    "# TYPE etl_browser_heap_megabytes gauge",
+                    f"etl_browser_heap_megabytes {last['browser_heap_mb']}",
+                ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = METRICS_DIR):
+        # Escritura atómica: el textfile collector puede leer en cualquier momento
+        folder = Path(directory)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, content in ((METRICS_JSON, json.dumps(self.to_dict(), indent=1)),
+                              (METRICS_PROM, self.to_prometheus())):
+            path = folder / name
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(content, encoding="utf-8")
+            os.replace(tmp, path)
+        log.info(f"Métricas exportadas en {folder / METRICS_JSON} y {folder / METRICS_PROM}")
+
+    def table(self) -> str:
+        lines = [f"  {'etapa':<14}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for stage, stats in sorted(self.stage_summary().items(), key=lambda kv: -kv[1]["sum_ms"]):
+            lines.append(f"  {stage:<14}{stats['count']:>7}{stats['p50_ms']:>9.0f}"
+                         f"{stats['p95_ms']:>9.0f}{stats['p99_ms']:>9.0f}")
+        lines.append(f"  Páginas/min: {self.pages_per_minute():.1f}")
+        if self.startup:
+            phases = ", ".join(f"{k} {v:.1f}s" for k, v in self.startup.items())
+            lines.append(f"  Arranque ({self.browser_mode or '-'}): {phases}")
+        if self.memory:
+            peak = max(s["rss_mb"] for s in self.memory)
+            heap = max(s.get("browser_heap_mb", 0) for s in self.memory)
+            lines.append(f"  Memoria pico: RSS {peak:.0f} MB, heap browser {heap:.0f} MB")
+        return "\n".join(lines)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+from structured_data import MAX_REVIEWS, StructuredData
+
+log = logging.getLogger(__name__)
+
+# Respuestas JSON propias de la página que traen reseñas o rating
+CAPTURE_URL_PATTERNS = ("/api/v3/StaysPdpReviews", "/api/v3/StaysPdpSections", "/api/v2/reviews")
+SETTLE_TIMEOUT_S = 2.0
+
+
+class ResponseCapture:
+    # Escucha page.on("response") y parsea los JSON de reseñas/rating a medida
+    # que llegan. Si la página ya los cargó, el click en "Show all reviews" y la
+    # espera del modal no hacen falta.
+
+    def __init__(self, patterns=CAPTURE_URL_PATTERNS):
+        self.patterns = patterns
+        # Las respuestas se acumulan en un único StructuredData (mismas consultas
+        # que JSON-LD/__NEXT_DATA__)
+        self.data = StructuredData()
+        self.responses = 0
+        self._pending: set[asyncio.Task] = set()
+
+    def _matches(self, url: str) -> bool:
+        return any(p in url for p in self.patterns)
+
+    def _on_response(self, response):
+        if not self._matches(response.url):
+            return
+        task = asyncio.ensure_future(self._consume(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _consume(self, response):
+        try:
+            if response.status != 200:
+                return
+            data = await response.json()
+        except Exception as e:
+            log.debug(f"Respuesta no parseable {response.url}: {e}")
+            return
+        self.responses += 1
+        self.feed(data)
+
+    def feed(self, data):
+        self.data.feed_obj(data)
+
+    @property
+    def reviews(self) -> list[str]:
+        return self.data.reviews
+
+    @property
+    def rating(self):
+        return self.data.rating
+
+    @property
+    def review_count(self):
+        return self.data.review_count
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def detach(self, page):
+        try:
+            page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+        for task in self._pending:
+            task.cancel()
+
+    async def settle(self, timeout: float = SETTLE_TIMEOUT_S):
+        # Espera a que terminen de parsearse las respuestas que ya llegaron
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    def merge(self, fields: dict) -> dict:
+        # Lo que vino por red tiene prioridad para las reseñas; rating y
+        # cantidad solo completan lo que falte
+        if self.reviews:
+            fields["reviews"] = self.reviews[:MAX_REVIEWS]
+        if fields.get("rating") is None and self.rating is not None:
+            fields["rating"] = self.rating
+        if fields.get("review_count") is None and self.review_count is not None:
+            fields["review_count"] = self.review_count
+        return fields
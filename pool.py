@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# Un context se recicla después de N listings o si el heap JS supera el umbral
+CONTEXT_MAX_USES = 25
+CONTEXT_MAX_HEAP_MB = 300
+
+HEAP_JS = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+
+@dataclass
+class PooledPage:
+    context: object
+    page: object
+    uses: int = 0
+    healthy: bool = True
+    heap_mb: float = 0.0
+
+
+class PagePool:
+    def __init__(self, browser, size: int, new_context, setup_context=None,
+                 max_uses: int = CONTEXT_MAX_USES, max_heap_mb: int = CONTEXT_MAX_HEAP_MB):
+        # new_context: callable async que crea el context (user agent, viewport, etc.)
+        # setup_context: callable async opcional que recibe (context, page) recién creados
+        self.browser = browser
+        self.size = size
+        self.new_context = new_context
+        self.setup_context = setup_context
+        self.max_uses = max_uses
+        self.max_heap_mb = max_heap_mb
+        self.recycled = 0
+        # Slots existentes (en uso, ociosos o pendientes de crear); nunca supera size
+        self.capacity = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots: list[PooledPage] = []
+
+    async def _create(self) -> PooledPage:
+        context = await self.new_context(self.browser)
+        page = await context.new_page()
+        if self.setup_context:
+            await self.setup_context(context, page)
+        slot = PooledPage(context=context, page=page)
+        self._slots.append(slot)
+        return slot
+
+    async def _discard(self, slot: PooledPage):
+        if slot in self._slots:
+            self._slots.remove(slot)
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def start(self, warm: Optional[int] = None):
+        # warm: contexts a crear de entrada; el resto se crea a demanda hasta size
+        warm = self.size if warm is None else min(warm, self.size)
+        for _ in range(warm):
+            self._idle.put_nowait(await self._create())
+            self.capacity += 1
+        log.info(f"Pool: {warm} contexts listos (máximo {self.size})")
+
+    async def _heap_mb(self, slot: PooledPage) -> float:
+        try:
+            return (await slot.page.evaluate(HEAP_JS)) / 1_000_000
+        except Exception:
+            return 0.0
+
+    async def _reset(self, slot: PooledPage) -> bool:
+        try:
+            await slot.page.goto("about:blank")
+            await slot.context.clear_cookies()
+            return True
+        except Exception:
+            return False
+
+    async def acquire(self) -> Optional[PooledPage]:
+        if self._idle.empty() and self.capacity < self.size:
+            # None = crear el context en checkout()
+            self.capacity += 1
+            return None
+        return await self._idle.get()
+
+    def heap_mb_total(self) -> float:
+        # Última medición de heap de cada página (se toma al liberar el slot)
+        return sum(slot.heap_mb for slot in self._slots)
+
+    async def shrink(self, target: int):
+        # Cierra contexts ociosos hasta quedar en target (cuando baja la concurrencia)
+        closed = 0
+        while self.capacity > target and not self._idle.empty():
+            slot = self._idle.get_nowait()
+            self.capacity -= 1
+            if slot is not None:
+                await self._discard(slot)
+                closed += 1
+        if closed:
+            log.info(f"Pool: {closed} contexts ociosos cerrados ({self.capacity} activos)")
+
+    async def release(self, slot: PooledPage):
+        slot.uses += 1
+        recycle = not slot.healthy or slot.uses >= self.max_uses
+        if not recycle and self.max_heap_mb:
+            heap = await self._heap_mb(slot)
+            slot.heap_mb = heap
+            if heap > self.max_heap_mb:
+                log.info(f"Pool: reciclando context por memoria ({heap:.0f} MB)")
+                recycle = True
+        if not recycle:
+            recycle = not await self._reset(slot)
+
+        if recycle:
+            self.recycled += 1
+            await self._discard(slot)
+            try:
+                slot = await self._create()
+            except Exception as e:
+                log.error(f"Pool: no se pudo recrear el context: {e}")
+                # Devolver algo al pool para no perder capacidad; se reintenta en el próximo uso
+                self._idle.put_nowait(None)
+                return
+        self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def checkout(self):
+        # El caller puede marcar slot.healthy = False para forzar el reciclado
+        slot = await self.acquire()
+        if slot is None:
+            try:
+                slot = await self._create()
+            except Exception:
+                self._idle.put_nowait(None)
+                raise
+        try:
+            yield slot
+        except BaseException:
+            slot.healthy = False
+            raise
+        finally:
+            await self.release(slot)
+
+    async def close(self):
+        for slot in list(self._slots):
+            await self._discard(slot)
+        log.info(f"Pool: cerrado ({self.recycled} contexts reciclados)")
@@ -0,0 +1,97 @@
+import time
+
+# Playwright se importa dentro de cada función: importar este módulo no lo carga
+
+# Deadlines por etapa (ms). Se espera solo hasta que aparece el contenido,
+# estos valores son el máximo.
+READY_TIMEOUT_MS = 8000
+REVIEW_BUTTON_TIMEOUT_MS = 3000
+DIALOG_TIMEOUT_MS = 5000
+CLOSE_TIMEOUT_MS = 1000
+
+# La página está lista cuando hay JSON-LD con aggregateRating, un h1 con
+# texto, o un marcador de bloqueo (para no esperar el deadline en un captcha)
+LISTING_READY_JS = """
+(markers) => {
+    for (const el of document.querySelectorAll('script[type="application/ld+json"]')) {
+        if ((el.textContent || "").includes("aggregateRating")) return true;
+    }
+    const h1 = document.querySelector("h1");
+    if (h1 && (h1.innerText || "").trim()) return true;
+    const body = (document.body && document.body.innerText || "").toLowerCase();
+    return markers.some(k => body.includes(k));
+}
+"""
+
+# El modal de reseñas está listo cuando tiene al menos un texto con largo de reseña
+DIALOG_READY_JS = """
+(minLen) => {
+    for (const el of document.querySelectorAll('div[role="dialog"] span')) {
+        if ((el.innerText || "").trim().length > minLen) return true;
+    }
+    return false;
+}
+"""
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self.timeouts: list[str] = []
+
+    def record(self, stage: str, started: float, ok: bool = True):
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.timings[stage] = round(self.timings.get(stage, 0) + elapsed_ms, 1)
+        if not ok:
+            self.timeouts.append(stage)
+
+    def summary(self) -> str:
+        return " ".join(f"{k}={v:.0f}ms" for k, v in self.timings.items())
+
+
+async def wait_for_function(page, timer: StageTimer, stage: str, js: str, arg, timeout_ms: int) -> bool:
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(js, arg=arg, timeout=timeout_ms, polling="raf")
+        ok = True
+    except PWTimeout:
+        ok = False
+    timer.record(stage, started, ok)
+    return ok
+
+
+async def wait_for_selector(page, timer: StageTimer, stage: str, selector: str,
+                            timeout_ms: int, state: str = "attached") -> bool:
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        await page.wait_for_selector(selector, state=state, timeout=timeout_ms)
+        ok = True
+    except PWTimeout:
+        ok = False
+    timer.record(stage, started, ok)
+    return ok
+
+
+async def wait_for_hidden(handle, timer: StageTimer, stage: str, timeout_ms: int) -> bool:
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        await handle.wait_for_element_state("hidden", timeout=timeout_ms)
+        ok = True
+    except PWTimeout:
+        ok = False
+    timer.record(stage, started, ok)
+    return ok
+
+
+async def wait_for_listing(page, timer: StageTimer, markers: list[str]) -> bool:
+    return await wait_for_function(page, timer, "ready", LISTING_READY_JS, markers, READY_TIMEOUT_MS)
+
+
+async def wait_for_review_dialog(page, timer: StageTimer, min_len: int = 40) -> bool:
+    return await wait_for_function(page, timer, "dialog", DIALOG_READY_JS, min_len, DIALOG_TIMEOUT_MS)
@@ -0,0 +1,88 @@
+import fnmatch
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Tipos de recurso que la extracción nunca lee (solo texto + JSON embebido)
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font", "texttrack", "eventsource", "manifest"}
+
+DEFAULT_BLOCKED_PATTERNS = [
+    "*a0.muscache.com/im/pictures/*",
+    "*a0.muscache.com/im/ml/*",
+    "*google-analytics.com/*",
+    "*googletagmanager.com/*",
+    "*doubleclick.net/*",
+    "*facebook.net/*",
+    "*facebook.com/tr*",
+    "*bat.bing.com/*",
+    "*hotjar.com/*",
+    "*sentry.io/*",
+    "*/tracking/*",
+    "*/logging/*",
+]
+
+# Excepciones por campo: si un campo necesita algo que la política bloquearía,
+# se agrega acá y gana sobre los bloqueos.
+DEFAULT_FIELD_ALLOW = {
+    "reviews": ["*/api/v3/StaysPdpReviews*"],
+}
+
+# Tamaño promedio por tipo para estimar bytes ahorrados (el request se aborta
+# antes de conocer el tamaño real)
+AVG_BYTES_BY_TYPE = {
+    "image": 80_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 60_000,
+    "stylesheet": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+DEFAULT_AVG_BYTES = 10_000
+
+
+@dataclass
+class RouteStats:
+    allowed: int = 0
+    blocked: int = 0
+    bytes_saved: int = 0
+    blocked_by_type: Counter = field(default_factory=Counter)
+
+    def summary(self) -> str:
+        mb = self.bytes_saved / 1_000_000
+        return f"{self.blocked} requests bloqueados (~{mb:.1f} MB), {self.allowed} permitidos"
+
+
+@dataclass
+class RoutePolicy:
+    blocked_types: set = field(default_factory=lambda: set(DEFAULT_BLOCKED_TYPES))
+    blocked_patterns: list = field(default_factory=lambda: list(DEFAULT_BLOCKED_PATTERNS))
+    field_allow: dict = field(default_factory=lambda: {k: list(v) for k, v in DEFAULT_FIELD_ALLOW.items()})
+    stats: RouteStats = field(default_factory=RouteStats)
+
+    def _allowed_by_field(self, url: str) -> bool:
+        return any(
+            fnmatch.fnmatch(url, pattern)
+            for patterns in self.field_allow.values()
+            for pattern in patterns
+        )
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self._allowed_by_field(url):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return any(fnmatch.fnmatch(url, pattern) for pattern in self.blocked_patterns)
+
+    async def handle(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.stats.blocked += 1
+            self.stats.blocked_by_type[request.resource_type] += 1
+            self.stats.bytes_saved += AVG_BYTES_BY_TYPE.get(request.resource_type, DEFAULT_AVG_BYTES)
+            await route.abort()
+        else:
+            self.stats.allowed += 1
+            await route.continue_()
+
+    async def attach(self, context):
+        await context.route("**/*", self.handle)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+
+log = logging.getLogger(__name__)
+
+# Presupuesto global de requests (independiente de cuántas páginas hay en vuelo)
+REQUEST_RATE = 2.0
+REQUEST_BURST = 2
+
+# Backoff exponencial para reintentos: base * 2^(intento-1), con tope y jitter
+RETRY_BACKOFF_BASE = 5.0
+RETRY_BACKOFF_MAX = 60.0
+
+# Items en cola por worker: el input se lee a medida que se procesa
+QUEUE_PER_WORKER = 4
+
+
+class RateLimiter:
+    # Token bucket: `rate` requests por segundo con ráfagas de hasta `burst`
+    def __init__(self, rate: float = REQUEST_RATE, burst: int = REQUEST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                # Jitter para que los requests no salgan en un patrón perfectamente regular
+                wait *= random.uniform(1.0, 1.3)
+                self.waited += wait
+                await asyncio.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BACKOFF_BASE, cap: float = RETRY_BACKOFF_MAX) -> float:
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(1.0, 2.0)
+
+
+class Scheduler:
+    # Cola acotada con un número fijo de workers. El input se consume de forma
+    # lazy (un productor lo va metiendo a la cola), así la memoria no depende
+    # del tamaño del archivo. Los reintentos no ocupan un worker mientras
+    # esperan: se re-encolan cuando vence el backoff.
+
+    def __init__(self, handler, workers: int, max_attempts: int,
+                 backoff_base: float = RETRY_BACKOFF_BASE, backoff_max: float = RETRY_BACKOFF_MAX,
+                 on_error=None):
+        # handler: async (item, attempt) -> bool, True si hay que reintentar
+        # on_error: (item, exc) para registrar un item cuyo handler siguió
+        # lanzando excepciones después del último intento
+        self.handler = handler
+        self.on_error = on_error
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=workers * QUEUE_PER_WORKER)
+        self.submitted = 0
+        self.retries = 0
+        self.failed = 0
+        self._outstanding = 0
+        self._producing = False
+        self._done = asyncio.Event()
+
+    async def submit(self, item):
+        self._outstanding += 1
+        self.submitted += 1
+        self._done.clear()
+        await self.queue.put((item, 1))
+
+    def _complete(self):
+        self._outstanding -= 1
+        self._check_done()
+
+    def _check_done(self):
+        if self._outstanding == 0 and not self._producing:
+            self._done.set()
+
+    def _schedule_retry(self, item, attempt: int):
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        log.info(f"Reintento {attempt} para {item} en {delay:.1f}s")
+        self.retries += 1
+        # El item sigue contando como pendiente hasta que termina, así que
+        # run() no sale mientras haya reintentos esperando
+        asyncio.get_running_loop().call_later(
+            delay, lambda: asyncio.ensure_future(self.queue.put((item, attempt + 1)))
+        )
+
+    async def _worker(self):
+        while True:
+            item, attempt = await self.queue.get()
+            error = None
+            try:
+                retry = await self.handler(item, attempt)
+            except Exception as e:
+                # Puede ser transitorio (un context roto del pool): se reintenta
+                log.error(f"Error no controlado en {item}: {e}")
+                error = e
+                retry = True
+            if retry and attempt < self.max_attempts:
+                self._schedule_retry(item, attempt)
+            else:
+                if error is not None:
+                    # Sin esto el item contaría como terminado sin dejar registro
+                    self.failed += 1
+                    if self.on_error is not None:
+                        try:
+                            self.on_error(item, error)
+                        except Exception as e:
+                            log.error(f"No se pudo registrar el error de {item}: {e}")
+                self._complete()
+            self.queue.task_done()
+
+    async def _produce(self, items):
+        try:
+            for item in items:
+                await self.submit(item)
+        finally:
+            self._producing = False
+            self._check_done()
+
+    async def run(self, items):
+        # items puede ser cualquier iterable, incluso un generador sobre un archivo enorme
+        self._producing = True
+        self._done.clear()
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        producer = asyncio.create_task(self._produce(items))
+        try:
+            await self._done.wait()
+            await producer
+        finally:
+            producer.cancel()
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+SELECTOR_STATS_FILE = "output/selector_stats.json"
+SELECTOR_REPORT_FILE = "output/selector_report.txt"
+
+# Un selector con al menos estos intentos y ningún hit se reporta como muerto
+DEAD_MIN_ATTEMPTS = 50
+# Hasta juntar estos intentos un selector mantiene su posición original
+MIN_ATTEMPTS_TO_RANK = 10
+
+
+class SelectorStats:
+    # Hit rate y latencia por (campo, selector), acumulados entre corridas.
+    # order() devuelve la cascada con los selectores que históricamente
+    # ganan primero; el orden por defecto desempata y cubre los nuevos.
+
+    def __init__(self, path: str = SELECTOR_STATS_FILE):
+        self.path = Path(path)
+        self.history: dict[str, dict[str, list]] = {}
+        # Solo lo de esta corrida: al guardar se suma sobre lo que haya en disco,
+        # así varios workers pueden compartir el archivo
+        self.run: dict[str, dict[str, list]] = {}
+
+    def load(self) -> "SelectorStats":
+        self.history = self._read()
+        return self
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"Stats de selectores ilegibles ({e}), se empieza de cero")
+            return {}
+
+    def _entry(self, stats: dict, field: str, selector: str) -> list:
+        # [intentos, hits, ms totales]
+        return stats.setdefault(field, {}).setdefault(selector, [0, 0, 0.0])
+
+    def record(self, field: str, selector: str, hit: bool, ms: float = 0.0):
+        for stats in (self.history, self.run):
+            entry = self._entry(stats, field, selector)
+            entry[0] += 1
+            entry[1] += int(hit)
+            entry[2] = round(entry[2] + ms, 1)
+
+    def record_probes(self, probes: Optional[list]):
+        # Formato de EXTRACT_JS: [{field, selector, hit, ms}, ...]
+        for probe in probes or []:
+            self.record(probe["field"], probe["selector"], bool(probe["hit"]), probe.get("ms") or 0.0)
+
+    def hit_rate(self, field: str, selector: str) -> Optional[float]:
+        attempts, hits, _ = self.history.get(field, {}).get(selector, [0, 0, 0.0])
+        return hits / attempts if attempts else None
+
+    def order(self, field: str, candidates: list[str]) -> list[str]:
+        stats = self.history.get(field, {})
+
+        def key(item):
+            index, selector = item
+            attempts, hits, ms = stats.get(selector, [0, 0, 0.0])
+            if attempts < MIN_ATTEMPTS_TO_RANK:
+                # Sin historia suficiente: detrás de los que ya probaron ganar,
+                # pero delante de los que vienen fallando
+                return (-0.5, 0.0, index)
+            return (-hits / attempts, ms / attempts, index)
+
+        return [sel for _, sel in sorted(enumerate(candidates), key=key)]
+
+    def dead(self) -> list[tuple[str, str, int]]:
+        return [
+            (field, selector, attempts)
+            for field, selectors in sorted(self.history.items())
+            for selector, (attempts, hits, _) in selectors.items()
+            if attempts >= DEAD_MIN_ATTEMPTS and hits == 0
+        ]
+
+    def report(self) -> str:
+        lines = []
+        for field, selectors in sorted(self.history.items()):
+            lines.append(f"[{field}]")
+            ranked = sorted(selectors.items(), key=lambda kv: -(kv[1][1] / kv[1][0] if kv[1][0] else 0))
+            for selector, (attempts, hits, ms) in ranked:
+                rate = hits / attempts * 100 if attempts else 0
+                avg = ms / attempts if attempts else 0
+                flag = "  MUERTO" if attempts >= DEAD_MIN_ATTEMPTS and hits == 0 else ""
+                lines.append(f"  {rate:5.1f}% {hits:>6}/{attempts:<6} {avg:6.1f}ms  {selector}{flag}")
+        return "\n".join(lines)
+
+    @contextmanager
+    def _locked(self):
+        # Leer-sumar-escribir bajo lock: si dos workers guardan a la vez ninguno
+        # pisa los intentos del otro
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def save(self, report_path: Optional[str] = SELECTOR_REPORT_FILE):
+        with self._locked():
+            merged = self._read()
+            for field, selectors in self.run.items():
+                for selector, (attempts, hits, ms) in selectors.items():
+                    entry = self._entry(merged, field, selector)
+                    entry[0] += attempts
+                    entry[1] += hits
+                    entry[2] = round(entry[2] + ms, 1)
+            self.history = merged
+            self.run = {}
+
+            # tmp por proceso: un .tmp compartido lo podría reemplazar otro worker
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+        if report_path:
+            Path(report_path).write_text(self.report() + "\n", encoding="utf-8")
+        for field, selector, attempts in self.dead():
+            log.warning(f"Selector muerto para {field} ({attempts} intentos sin hit): {selector}")
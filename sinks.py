@@ -0,0 +1,188 @@
+import csv
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# Las salidas se escriben fila por fila y se hace flush cada N filas o T segundos
+FLUSH_EVERY_ROWS = 50
+FLUSH_INTERVAL_S = 5.0
+# Parquet no sigue ese ritmo: un row group de 5 filas no sirve como columnar
+PARQUET_ROW_GROUP = 10_000
+
+
+def _open_text(path: str):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+class CsvSink:
+    def __init__(self, path: str, fieldnames: list[str]):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.f = _open_text(path)
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write(self, row: dict):
+        self.writer.writerow({k: row.get(k) for k in self.fieldnames})
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlSink:
+    # Una línea JSON por listing; con sufijo .gz se comprime al vuelo
+    def __init__(self, path: str):
+        self.path = path
+        self.f = _open_text(path)
+
+    def write(self, row: dict):
+        self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class JsonArraySink:
+    # Mantiene el formato de listings_output.json (array JSON) pero escribiendo
+    # incrementalmente; el "]" final se agrega al cerrar
+    def __init__(self, path: str):
+        self.path = path
+        self.f = _open_text(path)
+        self.f.write("[")
+        self.count = 0
+
+    def write(self, row: dict):
+        self.f.write(",\n" if self.count else "\n")
+        self.f.write(json.dumps(row, indent=2, ensure_ascii=False))
+        self.count += 1
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.write("\n]\n" if self.count else "]\n")
+        self.f.close()
+
+
+class ParquetSink:
+    # Opcional: requiere pyarrow. Junta PARQUET_ROW_GROUP filas por row group;
+    # el flush periódico de MultiSink no escribe nada antes, solo close().
+    # columns: {nombre: tipo} con tipos "string", "double", "int64", "bool",
+    # "list<string>" o "json" (dict serializado como string). Con un schema fijo
+    # los row groups no dependen de qué trae cada lote (columnas todas nulas,
+    # claves de timings distintas por listing).
+
+    def __init__(self, path: str, columns: dict[str, str], row_group: int = PARQUET_ROW_GROUP):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.path = path
+        self.json_columns = [name for name, kind in columns.items() if kind == "json"]
+        types = {"string": pa.string(), "double": pa.float64(), "int64": pa.int64(),
+                 "bool": pa.bool_(), "list<string>": pa.list_(pa.string()), "json": pa.string()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns.items()])
+        self.row_group = row_group
+        self.buffer: list[dict] = []
+        self.writer = None
+        self._pq = pq
+
+    def write(self, row: dict):
+        for name in self.json_columns:
+            if row.get(name) is not None:
+                row = {**row, name: json.dumps(row[name], ensure_ascii=False)}
+        self.buffer.append(row)
+        if len(self.buffer) >= self.row_group:
+            self._write_row_group()
+
+    def flush(self):
+        # Los row groups se escriben por tamaño (en write) y en close()
+        pass
+
+    def _write_row_group(self):
+        if not self.buffer:
+            return
+        table = self.pa.Table.from_pylist(self.buffer, schema=self.schema)
+        if self.writer is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.writer = self._pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def close(self):
+        self._write_row_group()
+        if self.writer is not None:
+            self.writer.close()
+
+
+class FilteredSink:
+    # Pasa al sink interno solo las filas que cumplen el predicado
+    def __init__(self, sink, predicate):
+        self.sink = sink
+        self.predicate = predicate
+        self.path = sink.path
+
+    def write(self, row: dict):
+        if self.predicate(row):
+            self.sink.write(row)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
+
+
+class MultiSink:
+    def __init__(self, sinks: list, flush_every: int = FLUSH_EVERY_ROWS,
+                 flush_interval: float = FLUSH_INTERVAL_S):
+        self.sinks = sinks
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.rows = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, row: dict):
+        for sink in self.sinks:
+            sink.write(row)
+        self.rows += 1
+        self._unflushed += 1
+        if (self._unflushed >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                log.error(f"Error cerrando {getattr(sink, 'path', sink)}: {e}")
+        log.info(f"Guardados {self.rows} registros en {', '.join(s.path for s in self.sinks)}")
+
+
+def parquet_sink(path: str, columns: dict[str, str]):
+    try:
+        return ParquetSink(path, columns)
+    except ImportError:
+        log.warning(f"pyarrow no está instalado, se omite {path}")
+        return None
@@ -0,0 +1,149 @@
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+from extraction import (
+    EXCLUDE_PREFIXES, MAX_REVIEWS, RATING_SELECTORS, REVIEW_COUNT_SELECTORS,
+    REVIEW_TEXT_SELECTORS, parse_payload, payload_from_html,
+)
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = "output/snapshots"
+
+
+class SnapshotArchive:
+    # Un archivo .json.gz por captura: output/snapshots/<listing_id>/<timestamp>.json.gz
+    # con el DOM final, el payload del page.evaluate y lo capturado por red.
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.saved = 0
+
+    def save(self, listing_id: str, url: str, html: str, payload: dict,
+             network: Optional[dict] = None) -> Path:
+        captured_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        folder = self.root / listing_id
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{captured_at.replace(':', '')}.json.gz"
+        snapshot = {
+            "listing_id": listing_id,
+            "url": url,
+            "captured_at": captured_at,
+            "html": html,
+            "payload": payload,
+            "network": network or {},
+        }
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.saved += 1
+        return path
+
+    def latest(self) -> Iterator[Path]:
+        # La captura más reciente de cada listing
+        if not self.root.exists():
+            return
+        for folder in sorted(self.root.iterdir()):
+            files = sorted(folder.glob("*.json.gz"))
+            if files:
+                yield files[-1]
+
+
+def load_snapshot(path) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dom_payload(html: str) -> Optional[dict]:
+    # Re-aplica los selectores CSS sobre el HTML guardado; requiere lxml +
+    # cssselect. Sin ellos se usan los textos que devolvió el browser.
+    try:
+        import lxml.html
+    except ImportError:
+        return None
+    try:
+        doc = lxml.html.fromstring(html)
+
+        def first_text(sel):
+            els = doc.cssselect(sel)
+            return els[0].text_content() if els else None
+
+        reviews = []
+        for sel in REVIEW_TEXT_SELECTORS:
+            if reviews:
+                break
+            seen = set()
+            for el in doc.cssselect(sel):
+                clean = " ".join(el.text_content().split())
+                if (40 < len(clean) < 2000 and clean not in seen
+                        and not clean.lower().startswith(EXCLUDE_PREFIXES)):
+                    seen.add(clean)
+                    reviews.append(clean)
+                if len(reviews) >= MAX_REVIEWS:
+                    break
+        return {
+            "ratingTexts": [first_text(s) for s in RATING_SELECTORS],
+            "reviewCountTexts": [first_text(s) for s in REVIEW_COUNT_SELECTORS],
+            "reviews": reviews,
+        }
+    except Exception:
+        return None
+
+
+def extract_snapshot(snapshot: dict) -> dict:
+    # Python puro: reconstruye los campos de ListingResult desde una captura
+    payload = payload_from_html(snapshot.get("html") or "")
+    stored = snapshot.get("payload") or {}
+    dom = _dom_payload(snapshot.get("html") or "")
+    if dom is None:
+        dom = {k: stored.get(k) or [] for k in ("ratingTexts", "reviewCountTexts", "reviews")}
+    payload.update(dom)
+    if not payload["jsonld"]:
+        payload["jsonld"] = stored.get("jsonld") or []
+    if not payload["nextData"]:
+        payload["nextData"] = stored.get("nextData")
+
+    fields = parse_payload(payload)
+    network = snapshot.get("network") or {}
+    if network.get("reviews"):
+        fields["reviews"] = network["reviews"][:MAX_REVIEWS]
+    if fields["rating"] is None:
+        fields["rating"] = network.get("rating")
+    if fields["review_count"] is None:
+        fields["review_count"] = network.get("review_count")
+
+    return {
+        "listing_id": snapshot["listing_id"],
+        "url": snapshot["url"],
+        "rating": fields["rating"],
+        "review_count": fields["review_count"],
+        "title": fields["title"],
+        "last_5_reviews": fields["reviews"],
+        "status": "success" if (fields["rating"] is not None or fields["review_count"] is not None) else "no_data",
+        "scraped_at": snapshot.get("captured_at"),
+    }
+
+
+def extract_snapshot_file(path: str) -> Optional[dict]:
+    try:
+        return extract_snapshot(load_snapshot(path))
+    except Exception as e:
+        log.warning(f"Snapshot ilegible {path}: {e}")
+        return None
+
+
+def reextract(root: str = SNAPSHOT_DIR, workers: Optional[int] = None) -> Iterator[dict]:
+    # Re-extracción offline sobre todo el archivo con un pool de procesos
+    paths = [str(p) for p in SnapshotArchive(root).latest()]
+    log.info(f"Re-extrayendo {len(paths)} snapshots desde {root}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for fields in pool.map(extract_snapshot_file, paths, chunksize=64):
+            if fields is not None:
+                yield fields
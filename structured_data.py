@@ -0,0 +1,192 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+REVIEW_MIN_LEN = 30
+REVIEW_MAX_LEN = 2000
+MAX_REVIEWS = 5
+
+# Consultas por sufijo de path: ("aggregateRating", "ratingValue") matchea
+# cualquier ratingValue cuyo padre sea aggregateRating; "*" matchea cualquier
+# clave o índice. Para cada campo escalar gana la consulta de la lista que esté
+# más arriba, no el primer match del documento: un avgRating de un listing
+# recomendado no le gana al aggregateRating del propio listing.
+QUERIES = {
+    "rating": [
+        ("aggregateRating", "ratingValue"),
+        ("overallRating",),
+        ("guestSatisfactionOverall",),
+        ("avgRating",),
+        ("starRating",),
+    ],
+    "review_count": [
+        ("aggregateRating", "reviewCount"),
+        ("reviewsCount",),
+        ("visibleReviewCount",),
+        ("overallCount",),
+    ],
+    "title": [
+        ("listingTitle",),
+    ],
+    "reviews": [
+        ("reviewBody",),
+        ("comments",),
+    ],
+}
+
+# Índice por última clave para no evaluar todas las consultas en cada hoja:
+# {clave: [(campo, prioridad, patrón), ...]}
+_BY_LAST_KEY: dict[str, list[tuple[str, int, tuple]]] = {}
+for _field, _patterns in QUERIES.items():
+    for _rank, _pattern in enumerate(_patterns):
+        _BY_LAST_KEY.setdefault(_pattern[-1], []).append((_field, _rank, _pattern))
+
+# Para el texto crudo: las consultas de una sola clave se leen directo; las de
+# varias se anclan en su primera clave y se decodifica solo ese objeto (chico)
+_SCAN_LEAF: dict[str, list[tuple[str, int]]] = {}
+_SCAN_ANCHOR: set[str] = set()
+for _field, _patterns in QUERIES.items():
+    for _rank, _pattern in enumerate(_patterns):
+        if len(_pattern) == 1:
+            _SCAN_LEAF.setdefault(_pattern[0], []).append((_field, _rank))
+        else:
+            _SCAN_ANCHOR.add(_pattern[0])
+_SCAN_KEYS = sorted({*_SCAN_LEAF, *_SCAN_ANCHOR})
+# El lookahead por primera letra descarta rápido la mayoría de las comillas del blob
+_KEY_RE = re.compile(r'"(?=[' + "".join(sorted({k[0] for k in _SCAN_KEYS})) + r'])('
+                     + "|".join(map(re.escape, _SCAN_KEYS)) + r')"\s*:\s*')
+
+
+def _path(key, link) -> list:
+    path = [key]
+    while link is not None:
+        path.append(link[0])
+        link = link[1]
+    path.reverse()
+    return path
+
+
+def _suffix_match(path: list, pattern: tuple) -> bool:
+    if len(pattern) > len(path):
+        return False
+    for want, got in zip(reversed(pattern), reversed(path)):
+        if want != "*" and want != got:
+            return False
+    return True
+
+
+@dataclass
+class StructuredData:
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    title: Optional[str] = None
+    reviews: list = field(default_factory=list)
+    _seen: set = field(default_factory=set, repr=False)
+    # Prioridad de la consulta que dio cada campo escalar (0 = la mejor)
+    _rank: dict = field(default_factory=dict, repr=False)
+
+    def _offer(self, name: str, value, rank: int = 0):
+        if name == "reviews":
+            if not isinstance(value, str) or len(self.reviews) >= MAX_REVIEWS:
+                return
+            clean = " ".join(value.split())
+            if REVIEW_MIN_LEN <= len(clean) < REVIEW_MAX_LEN and clean not in self._seen:
+                self._seen.add(clean)
+                self.reviews.append(clean)
+            return
+        if rank >= self._rank.get(name, len(QUERIES[name])):
+            return
+        if name == "rating":
+            try:
+                parsed = float(value)
+            except (TypeError, ValueError):
+                return
+            if not 0 < parsed <= 5:
+                return
+        elif name == "review_count":
+            try:
+                parsed = int(str(value).replace(",", ""))
+            except (TypeError, ValueError):
+                return
+        elif isinstance(value, str) and value.strip():
+            parsed = value.strip()
+        else:
+            return
+        setattr(self, name, parsed)
+        self._rank[name] = rank
+
+    def _satisfied(self, name: str) -> bool:
+        # Un escalar está resuelto cuando lo dio la consulta de mayor prioridad
+        if name == "reviews":
+            return len(self.reviews) >= MAX_REVIEWS
+        return self._rank.get(name) == 0
+
+    def feed_obj(self, obj):
+        # Un solo recorrido iterativo. El path se guarda como una cadena de
+        # tuplas (clave, padre) y solo se materializa cuando una clave matchea.
+        stack = [(obj, None)]
+        while stack:
+            node, link = stack.pop()
+            if isinstance(node, dict):
+                items = node.items()
+            elif isinstance(node, list):
+                items = enumerate(node)
+            else:
+                # null, número o string suelto en la raíz: no hay claves que mirar
+                continue
+            children = []
+            for key, value in items:
+                if isinstance(value, (dict, list)):
+                    children.append((value, (key, link)))
+                elif key.__class__ is str and key in _BY_LAST_KEY:
+                    for name, rank, pattern in _BY_LAST_KEY[key]:
+                        if not self._satisfied(name) and _suffix_match(_path(key, link), pattern):
+                            self._offer(name, value, rank)
+                            break
+            # reversed: mantiene el orden del documento al sacar del stack
+            stack.extend(reversed(children))
+
+    def feed_text(self, raw: str):
+        # JSON crudo (JSON-LD, __NEXT_DATA__): no se parsea entero. Una sola
+        # pasada con una regex que alterna las claves objetivo y raw_decode
+        # solo de cada valor; json.loads + recorrido del árbol cuesta varias
+        # veces más en un __NEXT_DATA__ de cientos de KB. Sirve igual para JSON
+        # inválido o truncado.
+        if not raw:
+            return
+        decoder = json.JSONDecoder()
+        for match in _KEY_RE.finditer(raw):
+            if all(self._satisfied(n) for n in QUERIES):
+                return
+            key, start = match.group(1), match.end()
+            if start >= len(raw):
+                break
+            if key in _SCAN_ANCHOR and raw[start] == "{":
+                try:
+                    obj, _ = decoder.raw_decode(raw, start)
+                except ValueError:
+                    continue
+                # Con la clave ancla como raíz los patrones de sufijo matchean igual
+                self.feed_obj({key: obj})
+            elif key in _SCAN_LEAF and raw[start] not in "{[":
+                try:
+                    value, _ = decoder.raw_decode(raw, start)
+                except ValueError:
+                    continue
+                if value is None:
+                    continue
+                for name, rank in _SCAN_LEAF[key]:
+                    if not self._satisfied(name):
+                        self._offer(name, value, rank)
+
+
+def extract_structured(jsonld: list[str], next_data: Optional[str] = None) -> StructuredData:
+    # JSON-LD primero (más confiable para rating/cantidad), después __NEXT_DATA__;
+    # cada blob se parsea exactamente una vez
+    data = StructuredData()
+    for raw in jsonld:
+        data.feed_text(raw)
+    if next_data:
+        data.feed_text(next_data)
+    return data
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+from checkpoint import CheckpointStore
+
+
+def record(i: int) -> dict:
+    return {"status": "success", "rating": 4.5, "payload": "x" * 50, "i": i}
+
+
+def test_journal_is_replayed_without_snapshot(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    store = CheckpointStore(path)
+    store.put("1", record(1))
+    store.put("1", record(2))
+    store.set_meta("ai_batches", {"b1": ["1"]})
+    # Sin close(): como un proceso que se cortó antes de compactar
+    store._journal.close()
+
+    loaded = CheckpointStore(path).load()
+    assert not loaded.path.exists()
+    assert loaded["1"]["i"] == 2
+    assert loaded.get_meta("ai_batches") == {"b1": ["1"]}
+
+
+def test_truncated_last_line_is_skipped_and_appends_continue(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    store = CheckpointStore(path)
+    store.put("1", record(1))
+    store._journal.close()
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"listing_id": "2", "sta')
+
+    loaded = CheckpointStore(path).load()
+    assert list(loaded.values()) == [{**record(1), "listing_id": "1"}]
+    loaded.put("3", record(3))
+    loaded._journal.close()
+    assert set(CheckpointStore(path).load()._index) == {"1", "3"}
+
+
+def test_compaction_by_size_and_close(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    store = CheckpointStore(path, compact_min_bytes=1000)
+    for i in range(100):
+        store.put(str(i), record(i))
+    assert store.path.exists()
+    store.close()
+
+    assert not store.journal_path.exists() and not store.rotated_path.exists()
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 101  # + __meta__
+    assert len(CheckpointStore(path).load()) == 100
+
+
+def test_background_compaction_keeps_every_record(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+
+    async def run():
+        store = CheckpointStore(path, compact_min_bytes=1000)
+        for i in range(2000):
+            store.put(str(i), record(i))
+            if i % 25 == 0:
+                await asyncio.sleep(0)
+        assert store._generation > 1
+        store.close()
+
+    asyncio.run(run())
+    assert len(CheckpointStore(path).load()) == 2000
+
+
+def test_rotated_journal_is_replayed_before_current(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    store = CheckpointStore(path)
+    store.put("1", record(1))
+    store._rotate()
+    store.put("1", record(2))
+    store._journal.close()
+
+    assert store.rotated_path.exists()
+    assert CheckpointStore(path).load()["1"]["i"] == 2
+
+
+def test_should_skip_reads_the_index(tmp_path):
+    from freshness import FreshnessPolicy
+
+    store = CheckpointStore(str(tmp_path / "checkpoint.json"))
+    store.put("1", {"status": "success", "scraped_at": "2000-01-01T00:00:00Z"})
+    store.put("2", {"status": "error"})
+
+    assert store.should_skip("1") and not store.should_skip("2") and not store.should_skip("3")
+    # Con política de frescura cuenta el TTL, no solo el status
+    assert not store.should_skip("1", FreshnessPolicy())
+    store.close()
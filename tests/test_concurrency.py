@@ -0,0 +1,87 @@
+import asyncio
+import random
+
+from concurrency import ConcurrencyController
+
+
+def feed(controller, statuses, latency_s=1.0, heap_mb=0.0):
+    for status in statuses:
+        controller.observe(status, latency_s, heap_mb)
+
+
+def statuses(rng, n, no_data_rate, error_rate=0.0):
+    out = []
+    for _ in range(n):
+        x = rng.random()
+        out.append("error" if x < error_rate else "no_data" if x < error_rate + no_data_rate else "success")
+    return out
+
+
+def run(coro_fn):
+    # observe() despierta a los que esperan con una tarea: necesita un loop
+    async def wrapper():
+        return coro_fn()
+    return asyncio.run(wrapper())
+
+
+def test_steady_no_data_share_does_not_shrink_the_limit():
+    # Como en las corridas del readme: ~39% no_data a cualquier concurrencia
+    def check():
+        for seed in range(50):
+            controller = ConcurrencyController(5, min_limit=2, max_limit=10)
+            feed(controller, statuses(random.Random(seed), 200, 0.39))
+            assert controller.limit == 5, (seed, controller.decisions)
+    run(check)
+
+
+def test_rise_in_no_data_over_baseline_halves_the_limit():
+    def check():
+        rng = random.Random(1)
+        controller = ConcurrencyController(8, min_limit=2, max_limit=10)
+        feed(controller, statuses(rng, 100, 0.39))
+        assert controller.limit == 8
+        feed(controller, statuses(rng, 100, 0.9))
+        assert controller.limit < 8
+        assert any(d["reason"].startswith("baja: no_data") for d in controller.decisions)
+    run(check)
+
+
+def test_persistent_no_data_at_the_minimum_becomes_the_new_baseline():
+    def check():
+        rng = random.Random(2)
+        controller = ConcurrencyController(2, min_limit=2, max_limit=10)
+        feed(controller, statuses(rng, 100, 0.1))
+        feed(controller, statuses(rng, 300, 0.7))
+        assert controller.no_data_baseline > 0.5
+    run(check)
+
+
+def test_errors_and_latency_halve_the_limit():
+    def check():
+        controller = ConcurrencyController(8, min_limit=2, max_limit=10)
+        feed(controller, ["error"] * 2 + ["success"] * 8)
+        assert controller.limit == 4
+        feed(controller, ["success"] * 10, latency_s=30.0)
+        assert controller.limit == 2
+        feed(controller, ["blocked"] * 10)
+        assert controller.limit == 2
+    run(check)
+
+
+def test_limit_grows_only_when_saturated():
+    async def check():
+        controller = ConcurrencyController(2, min_limit=1, max_limit=3, window=4)
+        feed(controller, ["success"] * 4)
+        assert controller.limit == 2
+
+        async def one():
+            async with controller.slot():
+                await asyncio.sleep(0.01)
+            controller.observe("success", 1.0)
+
+        await asyncio.gather(*[one() for _ in range(4)])
+        assert controller.limit == 3
+        await asyncio.gather(*[one() for _ in range(8)])
+        assert controller.limit == 3
+
+    asyncio.run(check())
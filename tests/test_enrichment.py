@@ -0,0 +1,154 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from bench.fixtures import FakeAIClient
+from enrichment import AIEnricher, build_packed_prompt, parse_packed_insights
+
+
+def listing(i) -> SimpleNamespace:
+    return SimpleNamespace(listing_id=str(i), last_5_reviews=[f"Review {i} about the place"],
+                           highlight=None, opportunity=None, timings={})
+
+
+def test_parse_packed_insights_keeps_only_well_formed_items():
+    raw = "```json\n" + json.dumps([
+        {"listing_id": 1, "highlight": "Views", "opportunity": "Wifi"},
+        {"listing_id": "2", "highlight": ""},
+        {"highlight": "sin id"},
+        "basura",
+        {"listing_id": "3", "highlight": "Bed"},
+    ]) + "\n```"
+    assert parse_packed_insights(raw) == {
+        "1": {"highlight": "Views", "opportunity": "Wifi"},
+        "3": {"highlight": "Bed", "opportunity": None},
+    }
+
+
+def test_parse_packed_insights_rejects_objects():
+    with pytest.raises(ValueError):
+        parse_packed_insights('{"highlight": "x"}')
+
+
+def test_packed_prompt_lists_every_listing():
+    prompt = build_packed_prompt([listing(1), listing(2)])
+    assert "Listing 1:\nReview 1: Review 1 about the place" in prompt
+    assert "Listing 2:" in prompt
+
+
+def test_missing_listings_fall_back_to_single_requests():
+    client = FakeAIClient(latency_s=0, drop_rate=0.5, seed=3)
+    enricher = AIEnricher(on_done=None, client=client, pack_size=6)
+    results = [listing(i) for i in range(6)]
+
+    asyncio.run(enricher.generate_packed(results))
+
+    assert all(r.highlight for r in results)
+    assert enricher.stats.fallbacks > 0
+    assert client.calls == 1 + enricher.stats.fallbacks
+    assert enricher.stats.listings == 6
+
+
+def test_broken_packed_response_falls_back_for_all():
+    class Broken(FakeAIClient):
+        async def create(self, **kwargs):
+            if "several Airbnb listings" in kwargs["messages"][0]["content"]:
+                self.calls += 1
+                return SimpleNamespace(content=[SimpleNamespace(text="no es json")], usage=None)
+            return await super().create(**kwargs)
+
+    enricher = AIEnricher(on_done=None, client=Broken(latency_s=0), pack_size=3)
+    results = [listing(i) for i in range(3)]
+    asyncio.run(enricher.generate_packed(results))
+    assert all(r.highlight for r in results)
+    assert enricher.stats.fallbacks == 3
+
+
+def test_worker_hands_every_item_to_on_done_when_ai_fails():
+    class Failing:
+        def __init__(self):
+            self.messages = self
+
+        async def create(self, **kwargs):
+            raise RuntimeError("sin red")
+
+    done = []
+
+    async def run():
+        enricher = AIEnricher(on_done=done.append, client=Failing(), pack_size=2, pack_wait=0.01)
+        enricher.start()
+        for i in range(5):
+            await enricher.submit(listing(i))
+        await enricher.close()
+
+    asyncio.run(run())
+    assert sorted(r.listing_id for r in done) == ["0", "1", "2", "3", "4"]
+    assert not any(r.highlight for r in done)
+
+
+def test_cache_is_used_off_the_event_loop(tmp_path):
+    from insights_cache import InsightsCache
+
+    cache = InsightsCache(str(tmp_path / "insights.sqlite"))
+    client = FakeAIClient(latency_s=0)
+
+    async def run(results):
+        await asyncio.gather(*[AIEnricher(on_done=None, client=client, cache=cache).generate(r) for r in results])
+
+    asyncio.run(run([listing(i) for i in range(4)]))
+    again = [listing(i) for i in range(4)]
+    asyncio.run(run(again))
+    cache.close()
+
+    assert client.calls == 4
+    assert all(r.highlight for r in again)
+    assert (cache.hits, cache.misses) == (4, 4)
+
+
+def test_packed_answers_are_cached_under_their_own_prompt_version(tmp_path, monkeypatch):
+    import enrichment
+    from insights_cache import InsightsCache
+
+    cache = InsightsCache(str(tmp_path / "insights.sqlite"))
+    asyncio.run(AIEnricher(on_done=None, client=FakeAIClient(latency_s=0), cache=cache,
+                           pack_size=3).generate_packed([listing(i) for i in range(3)]))
+
+    # Cambiar solo el prompt individual no invalida lo que dio el empaquetado
+    monkeypatch.setattr(enrichment, "PROMPT_VERSION", "2")
+    client = FakeAIClient(latency_s=0)
+    asyncio.run(AIEnricher(on_done=None, client=client, cache=cache).generate(listing(0)))
+    assert client.calls == 0
+
+    monkeypatch.setattr(enrichment, "PACKED_PROMPT_VERSION", "packed-2")
+    asyncio.run(AIEnricher(on_done=None, client=client, cache=cache).generate(listing(1)))
+    cache.close()
+    assert client.calls == 1
+
+
+def test_stage_keeps_its_own_concurrency_limit():
+    class Counting(FakeAIClient):
+        in_flight = peak = 0
+
+        async def create(self, **kwargs):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                return await super().create(**kwargs)
+            finally:
+                self.in_flight -= 1
+
+    client = Counting(latency_s=0.01)
+    done = []
+
+    async def run():
+        enricher = AIEnricher(on_done=done.append, client=client, concurrency=3, pack_size=1)
+        enricher.start()
+        for i in range(12):
+            await enricher.submit(listing(i))
+        await enricher.close()
+
+    asyncio.run(run())
+    assert len(done) == 12 and all(r.highlight for r in done)
+    assert client.calls == 12 and client.peak == 3
@@ -0,0 +1,66 @@
+import calendar
+import time
+
+from freshness import (TIME_FORMAT, FreshnessPolicy, carry_over, fingerprint, is_delta,
+                       is_unchanged)
+
+NOW = calendar.timegm(time.strptime("2026-10-17T12:00:00Z", TIME_FORMAT))
+
+
+def hours_ago(h: float) -> str:
+    return time.strftime(TIME_FORMAT, time.gmtime(NOW - h * 3600))
+
+
+def test_ttl_depends_on_status():
+    policy = FreshnessPolicy()
+    assert policy.is_fresh({"status": "success", "scraped_at": hours_ago(23)}, NOW)
+    assert not policy.is_fresh({"status": "success", "scraped_at": hours_ago(25)}, NOW)
+    assert not policy.is_fresh({"status": "no_data", "scraped_at": hours_ago(7)}, NOW)
+    assert not policy.is_fresh({"status": "error", "scraped_at": hours_ago(0)}, NOW)
+    assert not policy.is_fresh({"status": "success"}, NOW)
+    assert not policy.is_fresh(None, NOW)
+
+
+def test_ttl_override():
+    policy = FreshnessPolicy({"blocked": 0})
+    assert not policy.is_fresh({"status": "blocked", "scraped_at": hours_ago(0.5)}, NOW)
+
+
+def test_previous_needs_reviews():
+    policy = FreshnessPolicy()
+    assert policy.previous({"status": "success", "last_5_reviews": ["a"]})
+    assert policy.previous({"status": "success", "last_5_reviews": []}) is None
+    assert policy.previous({"status": "no_data", "last_5_reviews": ["a"]}) is None
+
+
+def test_fingerprint():
+    assert fingerprint(None, None, ["a"]) is None
+    assert fingerprint(4.9, 10, ["a", "b"]) == fingerprint(4.9, 10, ["a", "c"])
+    assert fingerprint(4.9, 10, ["a"]) != fingerprint(4.9, 11, ["a"])
+
+
+def test_is_unchanged_and_carry_over():
+    previous = {"rating": 4.9, "review_count": 10, "last_5_reviews": ["newest", "old"], "title": "Casa"}
+    assert is_unchanged(previous, {"rating": 4.9, "review_count": 10, "reviews": []})
+    assert is_unchanged(previous, {"rating": 4.9, "review_count": 10, "reviews": ["newest"]})
+    assert not is_unchanged(previous, {"rating": 4.9, "review_count": 10, "reviews": ["other"]})
+    assert not is_unchanged(previous, {"rating": 4.8, "review_count": 10, "reviews": []})
+    assert not is_unchanged(previous, {"rating": None, "review_count": 10, "reviews": []})
+    assert not is_unchanged(None, {"rating": 4.9, "review_count": 10, "reviews": []})
+
+    fields = carry_over(previous, {"rating": 4.9, "review_count": 10, "reviews": [], "title": None})
+    assert fields["reviews"] == ["newest", "old"] and fields["title"] == "Casa"
+
+
+def test_is_delta():
+    since = "2026-10-17T10:00:00Z"
+    assert is_delta({"changed": True, "scraped_at": "2026-10-17T11:00:00Z"}, since)
+    assert not is_delta({"changed": True, "scraped_at": "2026-10-16T11:00:00Z"}, since)
+    assert not is_delta({"changed": False, "scraped_at": "2026-10-17T11:00:00Z"}, since)
+
+
+def test_unknown_status_or_unreadable_timestamp_is_stale():
+    policy = FreshnessPolicy()
+    assert not policy.is_fresh({"status": "timeout", "scraped_at": hours_ago(0)}, NOW)
+    assert not policy.is_fresh({"status": "success", "scraped_at": "ayer"}, NOW)
+    assert FreshnessPolicy(default_ttl_h=1).is_fresh({"status": "timeout", "scraped_at": hours_ago(0.5)}, NOW)
@@ -0,0 +1,67 @@
+from lease_store import LeaseStore
+
+
+def test_seed_reopens_stale_done_rows(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.sqlite"))
+    assert store.seed([("1", "u1", False), ("2", "u2", True)]) == 2
+    assert store.lease("w1") == [("1", "u1")]
+    store.complete("1", "w1")
+    assert store.counts() == {"done": 2}
+
+    # Segunda corrida del día: "1" ya no está fresco, "2" sí
+    store.seed([("1", "u1", False), ("2", "u2", True)])
+    assert store.counts() == {"done": 1, "pending": 1}
+    assert store.lease("w2") == [("1", "u1")]
+
+    # Un lease en curso no se pisa al volver a sembrar
+    store.seed([("1", "u1", False)])
+    assert store.counts() == {"done": 1, "leased": 1}
+    store.close()
+
+
+def test_renew_extends_only_an_owned_lease(tmp_path, monkeypatch):
+    import lease_store
+
+    clock = [1000.0]
+    monkeypatch.setattr(lease_store.time, "time", lambda: clock[0])
+    store = LeaseStore(str(tmp_path / "leases.sqlite"), ttl=10)
+    store.seed([("1", "u1", False), ("2", "u2", False)])
+    assert store.lease("w1") == [("1", "u1"), ("2", "u2")]
+
+    # "1" sale de la cola a tiempo y se renueva; "2" se queda esperando
+    clock[0] = 1008.0
+    assert store.renew("1", "w1")
+    clock[0] = 1012.0
+    assert store.lease("w2") == [("2", "u2")]
+    assert not store.renew("2", "w1")
+    assert store.renew("2", "w2")
+    store.close()
+
+
+def test_concurrent_workers_never_lease_the_same_listing(tmp_path):
+    import threading
+
+    path = str(tmp_path / "leases.sqlite")
+    seeder = LeaseStore(path)
+    seeder.seed((str(i), f"u{i}", False) for i in range(300))
+    seeder.close()
+
+    leased = {}
+
+    def worker(owner):
+        # Una conexión por worker, como cada proceso en modo multi-proceso
+        store = LeaseStore(path)
+        mine = []
+        while batch := store.lease(owner, n=7):
+            mine.extend(lid for lid, _ in batch)
+        leased[owner] = mine
+        store.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    everything = [lid for mine in leased.values() for lid in mine]
+    assert sorted(everything, key=int) == [str(i) for i in range(300)]
@@ -0,0 +1,41 @@
+import json
+
+import main
+from checkpoint import CheckpointStore
+
+
+def test_merge_only_touches_this_runs_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "WORKERS_DIR", str(tmp_path / "workers"))
+    for worker_id, listing_id in (("host-a-0", "1"), ("host-a-1", "2"), ("host-b-0", "3")):
+        worker_cp = CheckpointStore(str(tmp_path / "workers" / worker_id / "checkpoint.json"))
+        worker_cp.put(listing_id, {"status": "success"})
+        if worker_id == "host-a-1":
+            # Worker caído antes de compactar: solo queda el journal
+            worker_cp._journal.close()
+        else:
+            worker_cp.close()
+
+    checkpoint = CheckpointStore(str(tmp_path / "checkpoint.json")).load()
+    assert main.merge_worker_checkpoints(checkpoint, ["host-a-0", "host-a-1", "host-a-2"]) == 2
+
+    assert "1" in checkpoint and "2" in checkpoint and "3" not in checkpoint
+    assert not any((tmp_path / "workers" / "host-a-1").iterdir())
+    # Otra máquina con el volumen compartido: su worker sigue intacto
+    assert (tmp_path / "workers" / "host-b-0" / "checkpoint.json").exists()
+
+
+def test_summary_adds_up_worker_cache_counters(tmp_path, monkeypatch):
+    from insights_cache import InsightsCache
+
+    monkeypatch.setattr(main, "WORKERS_DIR", str(tmp_path / "workers"))
+    for worker_id, hits in (("host-a-0", 3), ("host-a-1", 1)):
+        folder = tmp_path / "workers" / worker_id
+        folder.mkdir(parents=True)
+        (folder / main.WORKER_CACHE_STATS).write_text(json.dumps({"hits": hits, "misses": 2}))
+
+    cache = InsightsCache(str(tmp_path / "insights.sqlite"))
+    main.merge_worker_cache_stats(cache, ["host-a-0", "host-a-1", "host-a-2"])
+    cache.close()
+
+    assert (cache.hits, cache.misses) == (4, 4)
+    assert not (tmp_path / "workers" / "host-a-0" / main.WORKER_CACHE_STATS).exists()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from pool import PagePool
+
+
+class FakePage:
+    def __init__(self, heap_mb=0):
+        self.heap = heap_mb * 1_000_000
+        self.visits = []
+
+    async def evaluate(self, script):
+        return self.heap
+
+    async def goto(self, url):
+        self.visits.append(url)
+
+
+class FakeContext:
+    def __init__(self, heap_mb=0):
+        self.heap_mb = heap_mb
+        self.closed = False
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage(self.heap_mb)
+        self.pages.append(page)
+        return page
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(size, heap_mb=0, **kwargs):
+    contexts = []
+
+    async def new_context(browser):
+        contexts.append(FakeContext(heap_mb))
+        return contexts[-1]
+
+    return PagePool(browser=None, size=size, new_context=new_context, **kwargs), contexts
+
+
+def test_context_is_reused_then_recycled_after_max_uses():
+    pool, contexts = make_pool(1, max_uses=3)
+
+    async def run():
+        await pool.start()
+        for _ in range(4):
+            async with pool.checkout():
+                pass
+        await pool.close()
+
+    asyncio.run(run())
+    # Usos 1-2 resetean la página, el 3º recicla y el 4º ya usa el context nuevo
+    assert len(contexts) == 2 and pool.recycled == 1
+    assert contexts[0].pages[0].visits == ["about:blank"] * 2
+    assert contexts[1].pages[0].visits == ["about:blank"]
+    assert all(c.closed for c in contexts)
+
+
+def test_heap_over_threshold_recycles():
+    pool, contexts = make_pool(1, heap_mb=500, max_heap_mb=300)
+
+    async def run():
+        await pool.start()
+        async with pool.checkout():
+            pass
+
+    asyncio.run(run())
+    assert pool.recycled == 1 and contexts[0].closed
+
+
+def test_exception_marks_slot_unhealthy_and_capacity_holds():
+    pool, contexts = make_pool(2)
+
+    async def run():
+        await pool.start(warm=0)
+        with pytest.raises(RuntimeError):
+            async with pool.checkout():
+                raise RuntimeError("page crashed")
+
+        async def use():
+            async with pool.checkout():
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[use() for _ in range(5)])
+
+    asyncio.run(run())
+    assert contexts[0].closed
+    assert pool.capacity == 2
+    assert len(pool._slots) <= 2
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import scheduler
+from scheduler import RateLimiter, Scheduler, backoff_delay
+
+
+def test_backoff_is_exponential_and_capped():
+    for attempt, low in ((1, 5), (2, 10), (3, 20)):
+        assert low <= backoff_delay(attempt) <= 2 * low
+    assert backoff_delay(10) <= 2 * scheduler.RETRY_BACKOFF_MAX
+
+
+def test_retries_are_reenqueued_without_holding_a_worker():
+    attempts = {}
+    order = []
+
+    async def handler(item, attempt):
+        attempts[item] = attempt
+        order.append(item)
+        # "a" falla una vez; mientras espera su backoff el único worker sigue con el resto
+        return item == "a" and attempt == 1
+
+    sched = Scheduler(handler, workers=1, max_attempts=3, backoff_base=0.02, backoff_max=0.02)
+    asyncio.run(sched.run(iter(["a", "b", "c"])))
+
+    assert attempts == {"a": 2, "b": 1, "c": 1}
+    assert order == ["a", "b", "c", "a"]
+    assert sched.submitted == 3 and sched.retries == 1 and sched.failed == 0
+
+
+def test_exhausted_exceptions_are_counted_and_reported():
+    errors = []
+
+    async def handler(item, attempt):
+        if item == "bad":
+            raise RuntimeError(f"intento {attempt}")
+        return False
+
+    sched = Scheduler(handler, workers=2, max_attempts=2, backoff_base=0.01, backoff_max=0.01,
+                      on_error=lambda item, e: errors.append((item, str(e))))
+    asyncio.run(sched.run(["ok", "bad"]))
+
+    assert errors == [("bad", "intento 2")]
+    assert sched.failed == 1 and sched.retries == 1
+
+
+def test_rate_limiter_budget_is_independent_of_workers():
+    limiter = RateLimiter(rate=50, burst=1)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*[limiter.acquire() for _ in range(6)])
+        return time.monotonic() - started
+
+    # 1 de ráfaga + 5 a 50/s (con jitter de hasta 1.3x)
+    assert 0.09 <= asyncio.run(run()) < 0.5
+    assert limiter.waited > 0
@@ -0,0 +1,46 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import selector_stats
+from selector_stats import SelectorStats
+
+CANDIDATES = ["a", "b", "c", "d"]
+
+
+def test_order_puts_historical_winners_first(tmp_path):
+    stats = SelectorStats(str(tmp_path / "stats.json"))
+    for _ in range(20):
+        stats.record("rating", "a", hit=False, ms=5)
+        stats.record("rating", "c", hit=True, ms=5)
+        stats.record("rating", "d", hit=True, ms=1)
+    # b sin historia: detrás de los que ganan, delante del que siempre falla
+    assert stats.order("rating", CANDIDATES) == ["d", "c", "b", "a"]
+    assert stats.order("title", CANDIDATES) == CANDIDATES
+
+
+def test_dead_selectors_are_reported(tmp_path):
+    stats = SelectorStats(str(tmp_path / "stats.json"))
+    stats.record_probes([{"field": "rating", "selector": "a", "hit": False, "ms": 1}] * selector_stats.DEAD_MIN_ATTEMPTS
+                        + [{"field": "rating", "selector": "b", "hit": True, "ms": 2}])
+    report_path = tmp_path / "report.txt"
+    stats.save(str(report_path))
+
+    assert stats.dead() == [("rating", "a", selector_stats.DEAD_MIN_ATTEMPTS)]
+    assert "MUERTO" in report_path.read_text()
+    assert SelectorStats(str(tmp_path / "stats.json")).load().hit_rate("rating", "b") == 1.0
+
+
+def test_concurrent_saves_add_up(tmp_path):
+    path = str(tmp_path / "stats.json")
+
+    def worker(_):
+        stats = SelectorStats(path).load()
+        for _ in range(5):
+            stats.record("rating", "a", hit=True)
+            stats.save(report_path=None)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(worker, range(8)))
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["rating"]["a"][:2] == [40, 40]
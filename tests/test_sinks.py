@@ -0,0 +1,82 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from sinks import CsvSink, FilteredSink, JsonArraySink, JsonlSink, MultiSink
+
+ROWS = [
+    {"listing_id": "1", "status": "success", "rating": 4.9, "last_5_reviews": ["Muy lindo"],
+     "timings": {"goto": 120.5}},
+    {"listing_id": "2", "status": "no_data", "rating": None, "last_5_reviews": [], "timings": {}},
+]
+
+
+def test_text_sinks_roundtrip(tmp_path):
+    sink = MultiSink([
+        CsvSink(str(tmp_path / "out.csv"), ["listing_id", "status", "rating"]),
+        JsonArraySink(str(tmp_path / "out.json")),
+        JsonlSink(str(tmp_path / "out.jsonl.gz")),
+        FilteredSink(JsonlSink(str(tmp_path / "delta.jsonl")), lambda r: r["status"] == "success"),
+    ], flush_every=1)
+    for row in ROWS:
+        sink.write(row)
+    sink.close()
+
+    with open(tmp_path / "out.csv", encoding="utf-8") as f:
+        assert [r["listing_id"] for r in csv.DictReader(f)] == ["1", "2"]
+    assert json.loads((tmp_path / "out.json").read_text(encoding="utf-8")) == ROWS
+    with gzip.open(tmp_path / "out.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == ROWS
+    delta = (tmp_path / "delta.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["listing_id"] for line in delta] == ["1"]
+
+
+def test_empty_json_array_is_valid(tmp_path):
+    sink = JsonArraySink(str(tmp_path / "out.json"))
+    sink.close()
+    assert json.loads((tmp_path / "out.json").read_text(encoding="utf-8")) == []
+
+
+def test_parquet_has_fixed_schema_and_large_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from sinks import ParquetSink
+
+    columns = {"listing_id": "string", "status": "string", "rating": "double",
+               "last_5_reviews": "list<string>", "changed": "bool", "timings": "json"}
+    path = str(tmp_path / "out.parquet")
+    # Flush cada fila como en una corrida lenta: no debe generar row groups chicos
+    sink = MultiSink([ParquetSink(path, columns, row_group=3)], flush_every=1)
+    # Primer lote todo nulo en rating/changed y timings con claves distintas
+    rows = [{**ROWS[1], "listing_id": str(i), "timings": {f"k{i}": i}} for i in range(4)] + [ROWS[0]]
+    for row in rows:
+        sink.write(row)
+    sink.close()
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == 5
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [3, 2]
+    table = parquet.read()
+    assert table.schema.field("rating").type == "double"
+    assert table.column("rating").to_pylist() == [None] * 4 + [4.9]
+    assert json.loads(table.column("timings").to_pylist()[0]) == {"k0": 0}
+
+
+def test_parquet_accepts_listing_results(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from dataclasses import asdict
+
+    import main
+    from sinks import parquet_sink
+
+    path = str(tmp_path / "listings.parquet")
+    sink = parquet_sink(path, main.PARQUET_COLUMNS)
+    sink.write(asdict(main.ListingResult(url="u", listing_id="1", status="success", rating=4.8,
+                                         review_count=10, last_5_reviews=["a"], changed=True,
+                                         timings={"goto": 10.0})))
+    sink.write(asdict(main.ListingResult(url="u2", listing_id="2", status="error")))
+    sink.close()
+    table = pq.read_table(path)
+    assert table.column_names == list(main.PARQUET_COLUMNS)
+    assert table.column("review_count").to_pylist() == [10, None]
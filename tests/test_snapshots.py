@@ -0,0 +1,49 @@
+import json
+
+from snapshots import SnapshotArchive, extract_snapshot, load_snapshot, reextract
+
+JSONLD = {"@type": "VacationRental", "aggregateRating": {"ratingValue": "4.87", "reviewCount": "123"}}
+HTML = (
+    "<html><head><script type=\"application/ld+json\">" + json.dumps(JSONLD) + "</script></head>"
+    "<body><h1>Casa &amp; jardín</h1></body></html>"
+)
+
+
+def snapshot(**overrides) -> dict:
+    return {"listing_id": "42", "url": "https://www.airbnb.com/rooms/42", "captured_at": "2026-10-17T12:00:00Z",
+            "html": HTML, "payload": {}, "network": {}, **overrides}
+
+
+def test_fields_come_from_the_stored_html():
+    fields = extract_snapshot(snapshot())
+    assert (fields["rating"], fields["review_count"], fields["title"]) == (4.87, 123, "Casa & jardín")
+    assert fields["status"] == "success" and fields["scraped_at"] == "2026-10-17T12:00:00Z"
+
+
+def test_network_reviews_and_stored_payload_fill_the_gaps():
+    reviews = [f"Network review number {i} with enough text" for i in range(7)]
+    fields = extract_snapshot(snapshot(
+        html="<html><body></body></html>",
+        payload={"ratingTexts": ["Rated 4.5 out of 5"]},
+        network={"reviews": reviews, "review_count": 9},
+    ))
+    assert fields["last_5_reviews"] == reviews[:5]
+    assert fields["review_count"] == 9
+    assert fields["status"] == "success"
+
+
+def test_no_data_without_rating_or_count():
+    assert extract_snapshot(snapshot(html="<html></html>"))["status"] == "no_data"
+
+
+def test_archive_roundtrip_and_reextract_uses_latest(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    old = archive.save("42", "u", "<html></html>", {})
+    old.rename(old.with_name("20000101T000000Z.json.gz"))
+    path = archive.save("42", "u", HTML, {"jsonld": []}, network={"reviews": []})
+    archive.save("7", "u7", HTML, {})
+
+    assert load_snapshot(path)["html"] == HTML
+    assert [p.parent.name for p in archive.latest()] == ["42", "7"]
+    results = sorted(reextract(str(tmp_path), workers=1), key=lambda f: f["listing_id"])
+    assert [(f["listing_id"], f["rating"]) for f in results] == [("42", 4.87), ("7", 4.87)]
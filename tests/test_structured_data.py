@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import structured_data
+from structured_data import StructuredData, extract_structured
+
+REVIEW = "Great place, very clean and the host was friendly — café downstairs"
+
+
+def test_path_suffix_wins_over_loose_keys():
+    jsonld = [json.dumps({"@type": "VacationRental", "name": "Casa",
+                          "aggregateRating": {"ratingValue": "4.91", "reviewCount": "1,240"}})]
+    next_data = json.dumps({"props": {"pageProps": {
+        "listingTitle": "Casa en la playa",
+        "reviews": [{"comments": REVIEW}, {"comments": "short"}],
+        "avgRating": 3.0,
+    }}}, ensure_ascii=False)
+
+    data = extract_structured(jsonld, next_data)
+
+    assert data.rating == 4.91
+    assert data.review_count == 1240
+    assert data.title == "Casa en la playa"
+    assert data.reviews == [REVIEW]
+
+
+SIMILAR_FIRST = {"similar": [{"avgRating": 3.1, "reviewsCount": 7}],
+                 "listing": {"aggregateRating": {"ratingValue": 4.9, "reviewCount": 200}}}
+
+
+def test_query_priority_beats_document_order():
+    data = StructuredData()
+    data.feed_obj(SIMILAR_FIRST)
+    assert (data.rating, data.review_count) == (4.9, 200)
+
+
+def test_query_priority_beats_document_order_in_raw_text():
+    data = StructuredData()
+    data.feed_text(json.dumps(SIMILAR_FIRST))
+    assert (data.rating, data.review_count) == (4.9, 200)
+
+
+def test_lower_priority_match_is_kept_when_nothing_better_appears():
+    data = StructuredData()
+    data.feed_obj({"similar": [{"avgRating": 3.1}], "other": {"ratingValue": 2.0}})
+    assert data.rating == 3.1
+
+
+def test_reviews_are_deduplicated_and_capped():
+    doc = {"reviews": [{"comments": f"{REVIEW} #{i % 7}"} for i in range(20)]}
+    data = StructuredData()
+    data.feed_obj(doc)
+    assert len(data.reviews) == structured_data.MAX_REVIEWS
+    assert len(set(data.reviews)) == len(data.reviews)
+
+
+@pytest.mark.parametrize("raw", ["null", "3", '"texto"', "[1, null, true]", "{}"])
+def test_non_container_json_is_ignored(raw):
+    data = StructuredData()
+    data.feed_text(raw)
+    assert data == StructuredData()
+
+
+def test_invalid_json_is_still_read():
+    raw = '{"aggregateRating": {"ratingValue": 4.5, "reviewCount": 12}, "comments": "%s", oops' % REVIEW
+    data = StructuredData()
+    data.feed_text(raw)
+    assert (data.rating, data.review_count, data.reviews) == (4.5, 12, [REVIEW])
+
+
+def test_raw_text_keeps_unicode_intact():
+    review = "Niño feliz, vista al mar 日本 y una cocina enorme para cocinar"
+    blob = json.dumps({"filler": ["x" * 50] * 10, "reviews": [{"comments": review}],
+                       "overallRating": 4.8, "reviewsCount": 33})
+
+    data = StructuredData()
+    data.feed_text(blob)
+
+    assert data.reviews == [review]
+    assert (data.rating, data.review_count) == (4.8, 33)